@@ -0,0 +1,148 @@
+"""Recall@k and latency of fixed versus adaptive vector search per scope size.
+
+Seeds a separate benchmark database with synthetic chunk vectors of one user
+whose resources span several sizes, plus background chunks of other users, so
+that every resource is a small share of the index. Each resource is searched
+with the former fixed parameters (`numCandidates = 10 * limit`) and with the
+plan derived from its chunk count, which switches to an exact search for small
+scopes. Recall is measured against exact search in NumPy. Needs a running
+Atlas deployment, e.g. mongodb-atlas-local, at the configured URI. The
+benchmark database is dropped at the end.
+
+Usage (from the backend directory):
+    python -m benchmarks.adaptive_search --scopes 20,200,2000,20000 --background 100000
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from benchmarks.vector_store import wait_until_queryable
+from src.config import CONFIG, VectorQuantization
+from src.database import init_database
+from src.nlp.searchplan import SearchPlan, plan_vector_search
+from src.nlp.vectors import to_bson_vector
+from src.nlp.vectorstore import AtlasVectorStore
+from src.resources.models import Chunk
+
+
+def make_vectors(rng, centroids, n: int) -> np.ndarray:
+    vectors = centroids[rng.integers(len(centroids), size=n)]
+    vectors = vectors + 0.8 * rng.standard_normal(vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def insert(collection, user_id, resource_id, vectors) -> list[ObjectId]:
+    chunks = [
+        {
+            "_id": ObjectId(),
+            "user": user_id,
+            "resource": resource_id,
+            "content": "",
+            "index": i,
+            "embedding": to_bson_vector(vector),
+        }
+        for i, vector in enumerate(vectors)
+    ]
+    for start in range(0, len(chunks), 10000):
+        await collection.insert_many(chunks[start : start + 10000])
+    return [chunk["_id"] for chunk in chunks]
+
+
+async def measure(store, queries, user_id, resource_id, truth, k, plan: SearchPlan):
+    latencies = []
+    hits = 0
+
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results, _ = await store.search(
+            query, user_id, [resource_id], plan.limit, {"_id": 1},
+            num_candidates=plan.num_candidates, exact=plan.exact,
+        )
+        latencies.append(time.perf_counter() - start)
+        hits += len({r["_id"] for r in results[:k]} & expected)
+
+    return hits / (k * len(queries)), float(np.median(latencies)) * 1000
+
+
+async def run(args) -> None:
+    CONFIG.mongo.db_name = args.db
+    CONFIG.mongo.search_index_dimensions = args.dims
+    CONFIG.mongo.search_index_ann_dimensions = 0
+    CONFIG.mongo.search_index_quantization = VectorQuantization.NONE
+
+    rng = np.random.default_rng(args.seed)
+    centroids = rng.standard_normal((args.clusters, args.dims)).astype(np.float32)
+    scopes = list(map(int, args.scopes.split(",")))
+
+    client = await init_database()
+    collection = Chunk.get_pymongo_collection()
+    await collection.delete_many({})
+
+    user_id = ObjectId()
+    resources = []
+    for size in scopes:
+        vectors = make_vectors(rng, centroids, size)
+        resource_id = ObjectId()
+        ids = np.array(await insert(collection, user_id, resource_id, vectors), dtype=object)
+        resources.append((size, resource_id, vectors, ids))
+
+    for start in range(0, args.background, 50000):
+        n = min(50000, args.background - start)
+        await insert(collection, ObjectId(), ObjectId(), make_vectors(rng, centroids, n))
+
+    total = args.background + sum(scopes)
+    print(
+        f"{'scope':>7} {'mode':>8} {'limit':>6} {'cand':>6} {'exact':>6} "
+        f"{'recall@k':>9} {'p50 ms':>7}"
+    )
+
+    try:
+        store = AtlasVectorStore()
+        await store.create_index()
+        await wait_until_queryable(args.index_timeout)
+
+        for size, resource_id, vectors, ids in resources:
+            queries = make_vectors(rng, centroids, args.queries)
+            k = min(args.k, size)
+            truth = [set(ids[np.argsort(-(vectors @ query))[:k]]) for query in queries]
+
+            plans = {
+                "fixed": SearchPlan(limit=args.k, num_candidates=args.k * 10, exact=False),
+                "adaptive": plan_vector_search(size, total, args.k),
+            }
+            for mode, plan in plans.items():
+                recall, latency = await measure(
+                    store, queries, user_id, resource_id, truth, k, plan
+                )
+                print(
+                    f"{size:>7} {mode:>8} {plan.limit:>6} {plan.num_candidates:>6} "
+                    f"{str(plan.exact):>6} {recall:>9.3f} {latency:>7.2f}"
+                )
+
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="doc-rag-benchmark")
+    parser.add_argument("--scopes", default="20,200,2000,20000")
+    parser.add_argument("--background", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--k", type=int, default=CONFIG.mongo.search_top_k)
+    parser.add_argument("--index-timeout", type=float, default=900.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Throughput of batched chunk embedding against a local stand-in embedding server.
+
+The stand-in server speaks the Ollama `/api/embed` protocol and simulates a
+GPU that handles a limited number of requests in parallel, where every request
+costs a fixed overhead plus a per-text cost.
+
+Usage (from the backend directory):
+    python -m benchmarks.embed_chunks --chunks 1024 --batch-sizes 1,8,32,128 --concurrency 1,2,4
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_ollama import OllamaEmbeddings
+
+from src.nlp.batchembedder import BatchEmbedder
+
+
+def make_handler(dims: int, overhead: float, per_item: float, parallel: int):
+    slots = threading.Semaphore(parallel)
+
+    class StandInEmbedHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+            with slots:
+                time.sleep(overhead + per_item * len(texts))
+
+            payload = json.dumps(
+                {
+                    "model": body["model"],
+                    "embeddings": [[(len(t) % 7) / 7.0] * dims for t in texts],
+                }
+            ).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StandInEmbedHandler
+
+
+async def run(embedder: BatchEmbedder, texts: list[str]) -> float:
+    start = time.perf_counter()
+    embeddings = await embedder.embed(texts)
+    elapsed = time.perf_counter() - start
+    assert len(embeddings) == len(texts)
+    return len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--batch-sizes", default="1,8,32,128,512")
+    parser.add_argument("--concurrency", default="1,2,4")
+    parser.add_argument("--server-parallel", type=int, default=2)
+    parser.add_argument("--overhead-ms", type=float, default=20.0)
+    parser.add_argument("--per-item-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    handler = make_handler(
+        args.dims,
+        args.overhead_ms / 1000,
+        args.per_item_ms / 1000,
+        args.server_parallel,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = OllamaEmbeddings(
+        model="stand-in",
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+    )
+    texts = [f"[Source: Page {i // 4}, Type: text]\nchunk {i}" for i in range(args.chunks)]
+
+    print(f"{'batch size':>10} {'concurrency':>11} {'chunks/sec':>10}")
+    for batch_size in map(int, args.batch_sizes.split(",")):
+        for concurrency in map(int, args.concurrency.split(",")):
+            embedder = BatchEmbedder(
+                client=client,
+                batch_size=batch_size,
+                max_concurrency=concurrency,
+                max_retries=0,
+                retry_backoff=0.0,
+            )
+            throughput = asyncio.run(run(embedder, texts))
+            print(f"{batch_size:>10} {concurrency:>11} {throughput:>10.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Latency of MMR selection, vectorized versus the former pure-Python implementation.
+
+Candidates are random unit-ish vectors around the query, so relevance and
+redundancy vary like in real retrieval results. Both implementations must
+select the same indices.
+
+Usage (from the backend directory):
+    python -m benchmarks.mmr --sizes 32,256,1024 --dims 768
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from src.nlp.mmr import MMRSelector
+
+
+class LegacyMMRSelector(MMRSelector):
+    """The pure-Python selector `MMRSelector` replaced, kept for comparison."""
+
+    @staticmethod
+    def _dot(u: List[float], v: List[float]) -> float:
+        return sum(a * b for a, b in zip(u, v))
+
+    @classmethod
+    def _norm(cls, u: List[float]) -> float:
+        return (cls._dot(u, u) or 1.0) ** 0.5
+
+    @classmethod
+    def _cosine(cls, u: List[float], v: List[float]) -> float:
+        return cls._dot(u, v) / (cls._norm(u) * cls._norm(v))
+
+    def select(self, query_vec: List[float], doc_vecs: List[List[float]]) -> List[int]:
+        selected: List[int] = []
+        candidates = list(range(len(doc_vecs)))
+        relevance = [self._cosine(query_vec, d) for d in doc_vecs]
+
+        while candidates and len(selected) < self.final_k:
+            if not selected:
+                best = max(candidates, key=lambda i: relevance[i])
+            else:
+                best = max(
+                    candidates,
+                    key=lambda i: self.lambda_param * relevance[i]
+                    - (1.0 - self.lambda_param)
+                    * max(self._cosine(doc_vecs[i], doc_vecs[j]) for j in selected),
+                )
+            if relevance[best] >= self.similarity_threshold:
+                selected.append(best)
+            candidates.remove(best)
+
+        return selected
+
+
+def timed(func, repeat: int) -> tuple[float, object]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="32,256,1024")
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--final-k", type=int, default=8)
+    parser.add_argument("--lambda-param", type=float, default=0.7)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    selector_args = dict(
+        final_k=args.final_k,
+        lambda_param=args.lambda_param,
+        similarity_threshold=args.threshold,
+    )
+    legacy = LegacyMMRSelector(**selector_args)
+    vectorized = MMRSelector(**selector_args)
+
+    print(f"{'n':>6} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8} {'same':>5}")
+    for n in map(int, args.sizes.split(",")):
+        query = rng.standard_normal(args.dims).astype(np.float32)
+        noise = rng.standard_normal((n, args.dims)).astype(np.float32)
+        docs = query + noise * rng.uniform(0.5, 2.0, size=(n, 1)).astype(np.float32)
+
+        # The former implementation received the search results as lists
+        query_list, docs_list = query.tolist(), docs.tolist()
+
+        legacy_ms, legacy_selected = timed(
+            lambda: legacy.select(query_list, docs_list), args.repeat
+        )
+        numpy_ms, numpy_selected = timed(
+            lambda: vectorized.select(query_list, docs_list), args.repeat
+        )
+
+        print(
+            f"{n:>6} {legacy_ms:>10.2f} {numpy_ms:>10.2f} "
+            f"{legacy_ms / numpy_ms:>7.1f}x {str(legacy_selected == numpy_selected):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
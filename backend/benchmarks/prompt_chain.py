@@ -0,0 +1,79 @@
+"""Per-request overhead of building the chat prompt chain versus reusing a prebuilt one.
+
+Measures the time to build a chain, and the time to the first streamed token
+with a chain built per request (the former behaviour) or built once. A fake
+chat model answers instantly, so the difference is pure chain overhead on
+the time to first token.
+
+Usage (from the backend directory):
+    python -m benchmarks.prompt_chain --requests 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableConfig
+
+from src.nlp.prompts import build_prompt_chain
+
+
+HISTORIES = {}
+
+
+def get_session_history(session_id: str) -> InMemoryChatMessageHistory:
+    return HISTORIES.setdefault(session_id, InMemoryChatMessageHistory())
+
+
+async def first_token(chain, index: int) -> None:
+    variables = dict(query=f"What is the travel expense limit? ({index})", resources="- ID: 1")
+    config = RunnableConfig(configurable={"session_id": str(index)})
+    async for _ in chain.astream(variables, config):
+        break
+
+
+async def run(args) -> None:
+    model = FakeListChatModel(responses=["The limit is 100 EUR [1]."])
+
+    build_times = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        build_prompt_chain(model, get_session_history, "en", True)
+        build_times.append(time.perf_counter() - start)
+
+    per_request = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        await first_token(build_prompt_chain(model, get_session_history, "en", True), i)
+        per_request.append(time.perf_counter() - start)
+
+    chain = build_prompt_chain(model, get_session_history, "en", True)
+    prebuilt = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        await first_token(chain, args.requests + i)
+        prebuilt.append(time.perf_counter() - start)
+
+    print(f"{'measure':>22} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, times in (
+        ("build", build_times),
+        ("ttft, built/request", per_request),
+        ("ttft, prebuilt", prebuilt),
+    ):
+        times_ms = np.asarray(times) * 1000
+        print(f"{name:>22} {np.median(times_ms):>7.3f} {np.percentile(times_ms, 95):>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Recall@k and latency of Atlas quantized vector indexes with full-precision rescoring.
+
+Seeds a separate benchmark database with synthetic clustered, normalised
+chunk vectors of one user, then rebuilds the Atlas vector index without
+quantization and with scalar (int8) and binary quantization. Every mode is
+searched through `similarity_search`, i.e. the vector store and the over-fetch
+and rescore path of the application, once per rescore factor. Recall is
+measured against exact search in NumPy, latency per search including the
+rescoring. MMR, caching and the adaptive search planning are disabled, so
+only the quantization differs.
+
+Needs a running Atlas deployment, e.g. mongodb-atlas-local, at the configured
+URI and `VECTOR_STORE__BACKEND=atlas`. The benchmark database is dropped at
+the end.
+
+Usage (from the backend directory):
+    python -m benchmarks.quantization --chunks 20000 --queries 100 --factors 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from src.config import CONFIG, VectorQuantization
+from src.database import init_database
+from src.nlp.embeddings import similarity_search
+from src.nlp.vectors import to_bson_vector
+from src.nlp.vectorstore import VECTOR_STORE, AtlasVectorStore
+from src.resources.models import Chunk
+
+
+def make_corpus(rng, chunks: int, queries: int, dims: int, clusters: int):
+    centroids = rng.standard_normal((clusters, dims)).astype(np.float32)
+
+    def sample(n: int) -> np.ndarray:
+        vectors = centroids[rng.integers(clusters, size=n)]
+        vectors = vectors + 0.8 * rng.standard_normal((n, dims)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return sample(chunks), sample(queries)
+
+
+async def wait_until_applied(timeout: float) -> None:
+    collection = Chunk.get_pymongo_collection()
+    definition = AtlasVectorStore.search_index_definition()
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        indexes = await collection.list_search_indexes(CONFIG.mongo.search_index_name).to_list()
+        if (
+            indexes
+            and indexes[0].get("queryable")
+            and indexes[0].get("status") == "READY"
+            and indexes[0].get("latestDefinition", {}).get("fields") == definition["fields"]
+        ):
+            return
+        await asyncio.sleep(1)
+
+    raise TimeoutError("The Atlas search index did not become queryable.")
+
+
+async def run(args) -> None:
+    if not isinstance(VECTOR_STORE, AtlasVectorStore):
+        raise SystemExit("The quantization benchmark needs VECTOR_STORE__BACKEND=atlas.")
+
+    CONFIG.mongo.db_name = args.db
+    CONFIG.mongo.search_index_dimensions = args.dims
+    CONFIG.mongo.search_index_ann_dimensions = 0
+    CONFIG.mongo.search_top_k = args.k
+    CONFIG.mongo.search_top_resources = 0
+    CONFIG.mongo.search_cache_enabled = False
+    CONFIG.mongo.search_hybrid_enabled = False
+    CONFIG.mongo.search_adaptive_candidates = False
+    CONFIG.embedding_client.mmr_enabled = False
+    CONFIG.embedding_client.mmr_final_k = args.k
+    CONFIG.embedding_client.mmr_similarity_threashold = -1.0
+
+    rng = np.random.default_rng(args.seed)
+    corpus, queries = make_corpus(rng, args.chunks, args.queries, args.dims, args.clusters)
+
+    client = await init_database()
+    collection = Chunk.get_pymongo_collection()
+    await collection.delete_many({})
+
+    user_id = ObjectId()
+    resource_id = ObjectId()
+    chunks = [
+        {
+            "_id": ObjectId(),
+            "user": user_id,
+            "resource": resource_id,
+            "content": f"chunk {i}",
+            "index": i,
+            "page_number": 1,
+            "embedding": to_bson_vector(vector),
+        }
+        for i, vector in enumerate(corpus)
+    ]
+    for start in range(0, len(chunks), 10000):
+        await collection.insert_many(chunks[start : start + 10000])
+
+    ids = np.array([chunk["_id"] for chunk in chunks], dtype=object)
+    truth = [set(ids[np.argsort(-(corpus @ query))[: args.k]]) for query in queries]
+
+    print(f"{'mode':>7} {'factor':>6} {'recall@k':>9} {'p50 ms':>7} {'p95 ms':>7}")
+
+    try:
+        for mode in VectorQuantization:
+            CONFIG.mongo.search_index_quantization = mode
+            await VECTOR_STORE.create_index()
+            await wait_until_applied(args.index_timeout)
+
+            # Without quantization, scores are exact and nothing is over-fetched
+            factors = [1] if mode == VectorQuantization.NONE else map(int, args.factors.split(","))
+            for factor in factors:
+                CONFIG.mongo.search_rescore_factor = factor
+                latencies = []
+                hits = 0
+
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    results = await similarity_search("", user_id, None, query_embedding=query)
+                    latencies.append(time.perf_counter() - start)
+                    hits += len({r.id for r in results} & expected)
+
+                latencies_ms = np.asarray(latencies) * 1000
+                recall = hits / (args.k * len(queries))
+                print(
+                    f"{mode.value:>7} {factor:>6} {recall:>9.3f} "
+                    f"{np.median(latencies_ms):>7.2f} {np.percentile(latencies_ms, 95):>7.2f}"
+                )
+
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="doc-rag-benchmark")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--factors", default="1,2,4,8")
+    parser.add_argument("--index-timeout", type=float, default=900.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
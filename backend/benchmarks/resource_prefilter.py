@@ -0,0 +1,92 @@
+"""Recall@k of two-stage retrieval over resource summary vectors.
+
+Builds a synthetic library of resources covering a few topics each, summarizes
+every resource by spherical k-means centroids of its chunk vectors, and
+searches only the chunks of the `R` resources with the closest summaries.
+Recall is measured against exact search over all chunks, the searched column
+is the share of chunks scanned in the second stage.
+
+Usage (from the backend directory):
+    python -m benchmarks.resource_prefilter --resources 500 --top 10,25,50,100
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.nlp.vectors import rank_by_summaries, spherical_kmeans
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    best = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def make_library(rng, args):
+    topics = rng.standard_normal((args.topics, args.dims)).astype(np.float32)
+
+    vectors, owners = [], []
+    for resource in range(args.resources):
+        covered = rng.choice(args.topics, rng.integers(1, args.topics_per_resource + 1))
+        chunks = topics[rng.choice(covered, args.chunks_per_resource)]
+        chunks = chunks + 0.8 * rng.standard_normal(chunks.shape).astype(np.float32)
+        vectors.append(chunks / np.linalg.norm(chunks, axis=1, keepdims=True))
+        owners.append(np.full(len(chunks), resource))
+
+    return np.concatenate(vectors), np.concatenate(owners)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--chunks-per-resource", type=int, default=100)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--topics-per-resource", type=int, default=3)
+    parser.add_argument("--summary-vectors", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--top", default="10,25,50,100")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors, owners = make_library(rng, args)
+
+    summaries = [
+        spherical_kmeans(vectors[owners == resource], args.summary_vectors)
+        for resource in range(args.resources)
+    ]
+
+    queries = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    exact = [top_k(vectors @ query, args.k) for query in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"{'R':>5} {'recall@k':>9} {'searched':>9} {'ms/query':>9}")
+    print(f"{'all':>5} {1.0:>9.3f} {1.0:>9.3f} {exact_ms:>9.2f}")
+
+    for top in map(int, args.top.split(",")):
+        hits = 0
+        searched = 0
+        start = time.perf_counter()
+
+        for query, truth in zip(queries, exact):
+            selected = rank_by_summaries(query, summaries, top)
+            candidates = np.flatnonzero(np.isin(owners, selected))
+            found = candidates[top_k(vectors[candidates] @ query, args.k)]
+            hits += len(np.intersect1d(found, truth))
+            searched += len(candidates)
+
+        elapsed_ms = (time.perf_counter() - start) / len(queries) * 1000
+        recall = hits / (args.k * len(queries))
+        share = searched / (len(vectors) * len(queries))
+        print(f"{top:>5} {recall:>9.3f} {share:>9.3f} {elapsed_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Query latency and recall@k of the Atlas and the local vector store.
+
+Seeds a separate benchmark database with synthetic clustered chunk vectors of
+one user, builds both indexes and searches them with perturbed corpus vectors.
+Recall is measured against exact search. Atlas needs a running Atlas
+deployment, e.g. mongodb-atlas-local, at the configured URI, and is skipped
+with `--skip-atlas`. The benchmark database is dropped at the end.
+
+Usage (from the backend directory):
+    python -m benchmarks.vector_store --chunks 50000 --queries 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from src.config import CONFIG, VectorQuantization
+from src.database import init_database
+from src.nlp.vectors import to_bson_vector
+from src.nlp.vectorstore import AtlasVectorStore, LocalVectorStore, VectorStore
+from src.resources.models import Chunk
+
+
+async def wait_until_queryable(timeout: float) -> None:
+    collection = Chunk.get_pymongo_collection()
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        indexes = await collection.list_search_indexes(CONFIG.mongo.search_index_name).to_list()
+        if indexes and indexes[0].get("queryable") and indexes[0].get("status") == "READY":
+            return
+        await asyncio.sleep(1)
+
+    raise TimeoutError("The Atlas search index did not become queryable.")
+
+
+async def measure(store: VectorStore, queries, user_id, truth, k: int) -> tuple[float, float]:
+    latencies = []
+    hits = 0
+
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        results, _ = await store.search(query, user_id, None, k, {"_id": 1})
+        latencies.append(time.perf_counter() - start)
+        hits += len({r["_id"] for r in results} & expected)
+
+    return hits / (k * len(queries)), float(np.median(latencies)) * 1000
+
+
+async def run(args) -> None:
+    CONFIG.mongo.db_name = args.db
+    CONFIG.mongo.search_index_dimensions = args.dims
+    CONFIG.mongo.search_index_ann_dimensions = 0
+    CONFIG.mongo.search_index_quantization = VectorQuantization.NONE
+
+    rng = np.random.default_rng(args.seed)
+    centroids = rng.standard_normal((args.clusters, args.dims)).astype(np.float32)
+    vectors = centroids[rng.integers(args.clusters, size=args.chunks)]
+    vectors += 0.8 * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    queries = vectors[rng.integers(args.chunks, size=args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    client = await init_database()
+    collection = Chunk.get_pymongo_collection()
+    await collection.delete_many({})
+
+    user_id = ObjectId()
+    resources = [ObjectId() for _ in range(args.resources)]
+    chunks = [
+        {
+            "_id": ObjectId(),
+            "user": user_id,
+            "resource": resources[i % len(resources)],
+            "content": f"chunk {i}",
+            "index": i,
+            "embedding": to_bson_vector(vector),
+        }
+        for i, vector in enumerate(vectors)
+    ]
+    for start in range(0, len(chunks), 10000):
+        await collection.insert_many(chunks[start : start + 10000])
+
+    ids = np.array([chunk["_id"] for chunk in chunks], dtype=object)
+    truth = [
+        set(ids[np.argsort(-(vectors @ query))[: args.k]]) for query in queries
+    ]
+
+    print(f"{'store':>6} {'build s':>8} {'recall@k':>9} {'p50 ms':>7}")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            local = LocalVectorStore(directory, lists=args.lists, probes=args.probes)
+            start = time.perf_counter()
+            await local.create_index()
+            for batch in range(0, len(chunks), 10000):
+                await local.add(chunks[batch : batch + 10000])
+            build = time.perf_counter() - start
+
+            recall, latency = await measure(local, queries, user_id, truth, args.k)
+            print(f"{'local':>6} {build:>8.1f} {recall:>9.3f} {latency:>7.2f}")
+
+        if not args.skip_atlas:
+            atlas = AtlasVectorStore()
+            start = time.perf_counter()
+            await atlas.create_index()
+            await wait_until_queryable(args.index_timeout)
+            build = time.perf_counter() - start
+
+            recall, latency = await measure(atlas, queries, user_id, truth, args.k)
+            print(f"{'atlas':>6} {build:>8.1f} {recall:>9.3f} {latency:>7.2f}")
+
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="doc-rag-benchmark")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--resources", type=int, default=100)
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--lists", type=int, default=CONFIG.vector_store.ivf_lists)
+    parser.add_argument("--probes", type=int, default=CONFIG.vector_store.ivf_probes)
+    parser.add_argument("--index-timeout", type=float, default=600.0)
+    parser.add_argument("--skip-atlas", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
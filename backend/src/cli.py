@@ -0,0 +1,437 @@
+"""Command-line tools for the backend.
+
+Usage (from the backend directory):
+    python -m src.cli ingest --user alice@example.com /path/to/pdfs
+    python -m src.cli migrate-vectors
+    python -m src.cli rebuild-vector-store
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+
+from src.config import CONFIG
+from src.database import init_database
+from src.nlp.embeddings import ann_embedding, summarize_resource
+from src.nlp.pdfparser import PARSER_POOL
+from src.nlp.vectors import from_bson_vector, to_bson_vector
+from src.nlp.vectorstore import VECTOR_STORE, LocalVectorStore, indexed_field
+from src.resources.database import create_stored_pdf_resource
+from src.resources.ingestion import run_ingestion_job
+from src.resources.models import (
+    Chunk,
+    EmbeddingCacheEntry,
+    IngestionStatus,
+    PDFResource,
+    Resource,
+    ResourceType,
+)
+from src.resources.storage import store_local_file
+from src.users.database import bump_library_version
+from src.users.models import UserDB
+
+
+__logger = logging.getLogger(__name__)
+
+
+def find_pdf_files(directory: str) -> list[str]:
+    """Recursively list the PDF files of a directory tree in a stable order."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+
+
+async def find_user(user: str) -> UserDB:
+    """Find a user by email address or ID.
+
+    Raises:
+        SystemExit: If no such user exists.
+    """
+    if PydanticObjectId.is_valid(user):
+        user_db = await UserDB.get(PydanticObjectId(user))
+    else:
+        user_db = await UserDB.find_one(UserDB.email == user)
+
+    if user_db is None:
+        raise SystemExit(f"Unknown user: {user}")
+
+    return user_db
+
+
+async def ingest_file(file_path: str, user_id: PydanticObjectId, ingested: set[str]) -> PDFResource | None:
+    """Store and ingest a single PDF file for a user.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        user_id (PydanticObjectId): The ID of the user the resource belongs to.
+        ingested (set[str]): SHA-256 digests of the user's ready PDF resources.
+
+    Returns:
+        PDFResource | None: The ingested resource, or None if the file was skipped.
+    """
+    resource_id = PydanticObjectId()
+    stored_file = await store_local_file(file_path, user_id, ResourceType.PDF, resource_id)
+
+    if stored_file.sha256 in ingested:
+        os.remove(stored_file.path)
+        __logger.info(f"Skipping {file_path}, already ingested")
+        return None
+
+    ingested.add(stored_file.sha256)
+
+    resource = await create_stored_pdf_resource(
+        stored_file, os.path.basename(file_path), user_id, resource_id
+    )
+
+    if resource.ingestion.status == IngestionStatus.PROCESSING:
+        await run_ingestion_job(resource_id, stored_file.path)
+
+    return await PDFResource.get(resource_id)
+
+
+async def open_vector_store() -> None:
+    """Create the vector index, taking the lock of a local vector store.
+
+    Raises:
+        SystemExit: If another process, e.g. the API, uses the local vector store.
+    """
+    try:
+        await VECTOR_STORE.create_index()
+    except RuntimeError as e:
+        raise SystemExit(f"{e} Stop the API first.")
+
+
+async def ingest_directory(directory: str, user: str, concurrency: int) -> None:
+    """Ingest all PDF files of a directory tree for a user and print the throughput.
+
+    Parsing runs in the parser pool and embedding in shared, batched requests,
+    so files are processed concurrently. Files the user already has as a
+    ready resource (same content) are skipped.
+
+    Args:
+        directory (str): Root of the directory tree.
+        user (str): Email address or ID of the user.
+        concurrency (int): Number of files ingested at the same time.
+    """
+    client = await init_database()
+
+    try:
+        await open_vector_store()
+        user_db = await find_user(user)
+
+        ingested = {
+            resource.sha256
+            async for resource in PDFResource.find(
+                PDFResource.user == user_db.id,
+                PDFResource.ingestion.status == IngestionStatus.READY,
+            )
+            if resource.sha256
+        }
+
+        files = find_pdf_files(directory)
+        print(f"Found {len(files)} PDF files in {directory}")
+
+        await PARSER_POOL.start()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(file_path: str) -> PDFResource | None:
+            async with semaphore:
+                try:
+                    return await ingest_file(file_path, user_db.id, ingested)
+                except Exception:
+                    __logger.exception(f"Failed to ingest {file_path}")
+                    return None
+
+        start = time.perf_counter()
+        resources = [r for r in await asyncio.gather(*(run(f) for f in files)) if r]
+        elapsed = time.perf_counter() - start
+
+    finally:
+        PARSER_POOL.stop()
+        client.close()
+
+    ready = [r for r in resources if r.ingestion.status == IngestionStatus.READY]
+    pages = sum(r.total_pages for r in ready)
+    chunks = sum(r.ingestion.chunks_written for r in ready)
+
+    print(
+        f"Ingested {len(ready)} files, skipped {len(files) - len(resources)}, "
+        f"failed {len(resources) - len(ready)} in {elapsed:.1f}s"
+    )
+    print(f"{pages} pages ({pages / elapsed:.2f} pages/sec), "
+          f"{chunks} chunks ({chunks / elapsed:.2f} chunks/sec)")
+
+
+async def migrate_collection(collection, field: str, batch_size: int) -> int:
+    """Convert the array embeddings of a collection to BSON float32 vectors.
+
+    Args:
+        collection: The MongoDB collection to migrate.
+        field (str): The embedding field.
+        batch_size (int): Number of documents updated per bulk write.
+
+    Returns:
+        int: The number of converted documents.
+    """
+    converted = 0
+    batch = []
+
+    async def flush() -> None:
+        nonlocal converted, batch
+        if batch:
+            await collection.bulk_write(batch, ordered=False)
+            converted += len(batch)
+            batch = []
+
+    async for document in collection.find(
+        {field: {"$type": "array"}}, {field: 1}, batch_size=batch_size
+    ):
+        batch.append(
+            UpdateOne(
+                {"_id": document["_id"]},
+                {"$set": {field: to_bson_vector(document[field])}},
+            )
+        )
+        if len(batch) == batch_size:
+            await flush()
+
+    await flush()
+    return converted
+
+
+async def backfill_ann_embeddings(batch_size: int) -> int:
+    """Derive the truncated ANN embeddings of chunks lacking them for the configured dimensions.
+
+    Args:
+        batch_size (int): Number of documents updated per bulk write.
+
+    Returns:
+        int: The number of updated chunks.
+    """
+    collection = Chunk.get_pymongo_collection()
+    field = CONFIG.mongo.search_index_field
+    ann_field = CONFIG.mongo.search_index_ann_field
+
+    # float32 BSON vectors have a two byte header
+    expected_size = CONFIG.mongo.search_index_ann_dimensions * 4 + 2
+    query = {
+        "$expr": {
+            "$ne": [{"$binarySize": {"$ifNull": [f"${ann_field}", ""]}}, expected_size]
+        }
+    }
+
+    updated = 0
+    batch = []
+
+    async for document in collection.find(query, {field: 1}, batch_size=batch_size):
+        embedding = ann_embedding(from_bson_vector(document[field]))
+        batch.append(
+            UpdateOne({"_id": document["_id"]}, {"$set": {ann_field: to_bson_vector(embedding)}})
+        )
+
+        if len(batch) == batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+
+    return updated
+
+
+async def backfill_chunk_counts() -> int:
+    """Record the number of chunks of resources ingested before it was tracked.
+
+    Returns:
+        int: The number of updated resources.
+    """
+    collection = Resource.get_pymongo_collection()
+    chunks = Chunk.get_pymongo_collection()
+    query = {
+        "ingestion.status": {"$in": [IngestionStatus.READY.value, None]},
+        "ingestion.chunks_written": {"$in": [0, None]},
+    }
+
+    updated = 0
+    async for document in collection.find(query, {"_id": 1, "user": 1}):
+        count = await chunks.count_documents({"resource": document["_id"]})
+        if not count:
+            continue
+
+        await collection.update_one(
+            {"_id": document["_id"]}, {"$set": {"ingestion.chunks_written": count}}
+        )
+        await bump_library_version(document["user"])
+        updated += 1
+
+    return updated
+
+
+async def backfill_resource_summaries() -> int:
+    """Compute the summary vectors of ingested resources lacking them.
+
+    Returns:
+        int: The number of updated resources.
+    """
+    collection = Resource.get_pymongo_collection()
+    query = {
+        "ingestion.status": IngestionStatus.READY.value,
+        "summary_embeddings.0": {"$exists": False},
+    }
+
+    updated = 0
+    async for document in collection.find(query, {"_id": 1, "user": 1}):
+        summaries = await summarize_resource(document["_id"])
+        if not summaries:
+            continue
+
+        await collection.update_one(
+            {"_id": document["_id"]},
+            {"$set": {"summary_embeddings": [to_bson_vector(v) for v in summaries]}},
+        )
+        await bump_library_version(document["user"])
+        updated += 1
+
+    return updated
+
+
+async def migrate_vectors(batch_size: int) -> None:
+    """Convert stored embeddings to BSON float32 vectors and update the search index.
+
+    If ANN dimensions are configured, the truncated embeddings of existing
+    chunks are derived as well. Resources ingested before summary vectors
+    existed are summarized, and those ingested before their chunks were
+    counted are counted.
+
+    The migration can be interrupted and repeated, converted documents are
+    skipped. Search keeps working while it runs, as the index handles both
+    formats.
+
+    Args:
+        batch_size (int): Number of documents updated per bulk write.
+    """
+    client = await init_database()
+
+    try:
+        chunks = await migrate_collection(
+            Chunk.get_pymongo_collection(), CONFIG.mongo.search_index_field, batch_size
+        )
+        print(f"Converted {chunks} chunk embeddings")
+
+        cached = await migrate_collection(
+            EmbeddingCacheEntry.get_pymongo_collection(), "embedding", batch_size
+        )
+        print(f"Converted {cached} cached embeddings")
+
+        if CONFIG.mongo.search_index_ann_dimensions:
+            truncated = await backfill_ann_embeddings(batch_size)
+            print(f"Derived {truncated} truncated ANN embeddings")
+
+        summarized = await backfill_resource_summaries()
+        print(f"Summarized {summarized} resources")
+
+        counted = await backfill_chunk_counts()
+        print(f"Counted the chunks of {counted} resources")
+
+        await open_vector_store()
+
+    finally:
+        client.close()
+
+
+async def rebuild_vector_store(batch_size: int) -> None:
+    """Rebuild the local vector store from the chunks in MongoDB.
+
+    Needed after switching to the local backend or changing the indexed
+    dimensions. Atlas keeps its index in sync by itself.
+
+    Args:
+        batch_size (int): Number of chunks added at once.
+    """
+    if not isinstance(VECTOR_STORE, LocalVectorStore):
+        raise SystemExit("Only the local vector store can be rebuilt.")
+
+    try:
+        VECTOR_STORE.lock()
+    except RuntimeError as e:
+        raise SystemExit(f"{e} Stop the API first.")
+
+    client = await init_database()
+
+    try:
+        VECTOR_STORE.clear()
+        await VECTOR_STORE.create_index()
+
+        field = indexed_field()
+        collection = Chunk.get_pymongo_collection()
+        added = 0
+        batch = []
+
+        async for chunk in collection.find(
+            {field: {"$exists": True}},
+            {"user": 1, "resource": 1, field: 1},
+            batch_size=batch_size,
+        ):
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                await VECTOR_STORE.add(batch)
+                added += len(batch)
+                batch = []
+
+        await VECTOR_STORE.add(batch)
+        added += len(batch)
+        print(f"Added {added} chunks to the vector store in {VECTOR_STORE.directory}")
+
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="doc-rag backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Ingest a directory tree of PDF files for a user")
+    ingest.add_argument("directory")
+    ingest.add_argument("--user", required=True, help="Email address or ID of the user")
+    ingest.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONFIG.ingestion.parse_workers * 2,
+        help="Number of files ingested at the same time",
+    )
+
+    migrate = commands.add_parser(
+        "migrate-vectors",
+        help="Convert stored embeddings to BSON float32 vectors and derive ANN embeddings",
+    )
+    migrate.add_argument("--batch-size", type=int, default=1000)
+
+    rebuild = commands.add_parser(
+        "rebuild-vector-store", help="Rebuild the local vector store from the stored chunks"
+    )
+    rebuild.add_argument("--batch-size", type=int, default=10000)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "ingest":
+        asyncio.run(ingest_directory(args.directory, args.user, args.concurrency))
+    elif args.command == "migrate-vectors":
+        asyncio.run(migrate_vectors(args.batch_size))
+    elif args.command == "rebuild-vector-store":
+        asyncio.run(rebuild_vector_store(args.batch_size))
+
+
+# The parser pool spawns worker processes that import this module
+if __name__ == "__main__":
+    main()
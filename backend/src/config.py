@@ -1,10 +1,16 @@
 from enum import Enum
 import os
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class VectorQuantization(str, Enum):
+    NONE = "none"
+    SCALAR = "scalar"
+    BINARY = "binary"
+
+
 class MongoSettings(BaseModel):
 
     uri: str = "mongodb://localhost:27017"
@@ -14,6 +20,24 @@ class MongoSettings(BaseModel):
     search_index_field: str = "embedding"
     search_index_name: str = "embedding_index"
     search_top_k: int = 32
+    search_index_quantization: VectorQuantization = VectorQuantization.NONE
+    search_rescore_factor: int = 4
+    search_index_ann_field: str = "embedding_ann"
+    search_index_ann_dimensions: int = 0
+    search_top_resources: int = 0
+    resource_summary_vectors: int = 3
+    search_cache_enabled: bool = True
+    search_cache_max_entries: int = 4096
+    search_cache_max_users: int = 1024
+    search_hybrid_enabled: bool = False
+    search_lexical_top_k: int = 16
+    search_rrf_k: int = 60
+    lexical_index_name: str = "content_index"
+    lexical_index_analyzer: str = "lucene.standard"
+    search_adaptive_candidates: bool = True
+    search_exact_max_chunks: int = 2000
+    search_num_candidates_factor: int = 10
+    search_num_candidates_max_factor: int = 50
 
 
 class JWTSettings(BaseModel):
@@ -28,6 +52,8 @@ class JWTSettings(BaseModel):
 class StorageSettings(BaseModel):
 
     directory: str = os.path.join("..", "storage")
+    max_upload_bytes: int = 100 * 1024 * 1024
+    upload_chunk_bytes: int = 1024 * 1024
 
 
 class ModelProvider(str, Enum):
@@ -42,11 +68,24 @@ class EmbeddingClientSettings(BaseModel):
     temperature: float = 0.0
     chunk_size: int = 400
     chunk_overlap: int = 80
+    mmr_enabled: bool = True
     mmr_final_k: int = 8
     mmr_lambda_param: float = 0.7
     mmr_similarity_threashold: float = 0.3
     textcleaner_take: int = 2
     textcleaner_ratio: float = 0.7
+    embed_batch_size: int = 32
+    embed_max_concurrency: int = 2
+    embed_max_retries: int = 3
+    embed_retry_backoff: float = 1.0
+    embed_cache_enabled: bool = True
+    embed_cache_ttl_days: int = 30
+    query_batch_wait_ms: float = 5.0
+    query_batch_max_size: int = 16
+    query_embed_max_concurrency: int = 2
+    query_cache_enabled: bool = True
+    query_cache_max_mb: int = 16
+    query_cache_ttl_seconds: int = 3600
 
 
 class ChatClientSettings(BaseModel):
@@ -62,6 +101,39 @@ class InputClassifierSettings(BaseModel):
     model_name: str = "path/to/roberta"
 
 
+class IngestionSettings(BaseModel):
+    workers: int = 2
+    max_queue_size: int = 100
+    parse_workers: int = 2
+    window_pages: int = 10
+    window_prefetch: int = 2
+    text_layer_min_chars: int = 50
+    text_layer_min_alnum_ratio: float = 0.5
+    layout_strategy: str = "ocr_only"
+    max_retries: int = 2
+    retry_backoff_seconds: float = 30.0
+    abandoned_after_hours: int = 24
+    cleanup_interval_minutes: int = 60
+    pipeline_queue_size: int = 2
+
+
+class VectorStoreBackend(str, Enum):
+    ATLAS = "atlas"
+    LOCAL = "local"
+
+
+class VectorStoreSettings(BaseModel):
+    backend: VectorStoreBackend = VectorStoreBackend.ATLAS
+    directory: str = "./vectors"
+    ivf_lists: int = 256
+    ivf_probes: int = 16
+
+
+class SearchSettings(BaseModel):
+    batch_max_queries: int = 500
+    batch_concurrency: int = 8
+
+
 class Settings(BaseSettings):
 
     allow_origins: list[str] = ["*"]
@@ -84,6 +156,15 @@ class Settings(BaseSettings):
     # Input Classifier settings
     input_classifier: InputClassifierSettings = InputClassifierSettings()
 
+    # Ingestion settings
+    ingestion: IngestionSettings = IngestionSettings()
+
+    # Vector store settings
+    vector_store: VectorStoreSettings = VectorStoreSettings()
+
+    # Search API settings
+    search: SearchSettings = SearchSettings()
+
     model_config = SettingsConfigDict(
         env_nested_delimiter="__",
         env_file=os.path.join("..", ".env"),
@@ -91,6 +172,18 @@ class Settings(BaseSettings):
         env_ignore_empty=True,
     )
 
+    @model_validator(mode="after")
+    def check_hybrid_search_backend(self) -> "Settings":
+        # The lexical search runs on Atlas Search over the chunks collection
+        if (
+            self.mongo.search_hybrid_enabled
+            and self.vector_store.backend == VectorStoreBackend.LOCAL
+        ):
+            raise ValueError(
+                "MONGO__SEARCH_HYBRID_ENABLED requires VECTOR_STORE__BACKEND=atlas"
+            )
+        return self
+
 
 CONFIG = Settings()
 """Global configuration object."""
@@ -0,0 +1,83 @@
+import logging
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import ServerSelectionTimeoutError
+
+from src.config import CONFIG
+from src.resources.models import (
+    Chunk,
+    EmbeddingCacheEntry,
+    Resource,
+    PDFResource,
+    WebpageResource,
+    PDFChunk,
+    WebpageChunk,
+)
+from src.users.models import UserDB
+
+
+__logger = logging.getLogger(__name__)
+
+DOCUMENT_MODELS = [
+    UserDB,
+    Resource,
+    PDFResource,
+    WebpageResource,
+    Chunk,
+    PDFChunk,
+    WebpageChunk,
+    EmbeddingCacheEntry,
+]
+
+
+async def sync_embedding_cache_ttl(db: AsyncIOMotorDatabase) -> None:
+    """Apply a changed embedding cache TTL to the existing TTL index.
+
+    MongoDB refuses to create an index that exists with other options, so
+    the expiry of the existing index is changed in place with `collMod`
+    before Beanie creates the indexes.
+
+    Args:
+        db (AsyncIOMotorDatabase): The application database.
+    """
+    ttl = CONFIG.embedding_client.embed_cache_ttl_days * 86400
+    collection_name = EmbeddingCacheEntry.Settings.name
+
+    async for index in db[collection_name].list_indexes():
+        if dict(index["key"]) == {"last_used_at": 1} and index.get("expireAfterSeconds") != ttl:
+            await db.command(
+                "collMod",
+                collection_name,
+                index={"keyPattern": {"last_used_at": 1}, "expireAfterSeconds": ttl},
+            )
+            __logger.info(f"Embedding cache TTL changed to {ttl} seconds")
+
+
+async def init_database() -> AsyncIOMotorClient:
+    """Connect to MongoDB and initialize Beanie with all document models.
+
+    Returns:
+        AsyncIOMotorClient: The connected MongoDB client.
+
+    Raises:
+        Exception: If MongoDB is not reachable.
+    """
+    client = AsyncIOMotorClient(CONFIG.mongo.uri)
+    db = client.get_database(CONFIG.mongo.db_name)
+
+    try:
+        ping_response = await db.command("ping")
+    except ServerSelectionTimeoutError:
+        raise Exception("Timeout while connecting to MongoDB.")
+
+    if int(ping_response["ok"]) != 1:
+        raise Exception("Could not connect to MongoDB.")
+
+    __logger.info("MongoDB connection initialized successfully")
+
+    await sync_embedding_cache_ttl(db)
+    await init_beanie(db, document_models=DOCUMENT_MODELS)
+    __logger.info("Beanie initialized successfully")
+
+    return client
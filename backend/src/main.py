@@ -2,28 +2,21 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from pymongo.errors import ServerSelectionTimeoutError
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
 from starlette.middleware.cors import CORSMiddleware
 
 from src.config import CONFIG
-from src.nlp.embeddings import create_search_index
-from src.resources.models import (
-    Chunk,
-    Resource,
-    PDFResource,
-    WebpageResource,
-    PDFChunk,
-    WebpageChunk,
-)
-from src.users.models import UserDB
+from src.database import init_database
+from src.nlp.lexicalsearch import create_lexical_index
+from src.nlp.vectorstore import VECTOR_STORE
+from src.nlp.pdfparser import PARSER_POOL
 from src.users.routes import router as UsersRouter
 from src.auth.routes import router as AuthRouter
 from src.resources.routes import router as ResourcesRouter
+from src.resources.ingestion import INGESTION_QUEUE
+from src.resources.uploadlimit import UploadSizeLimitMiddleware
 from src.chat.routes import router as ChatRouter
-
-from src.resources.models import Chunk
+from src.search.routes import router as SearchRouter
+from src.metrics.routes import router as MetricsRouter
 
 
 logging.basicConfig(level=logging.INFO)
@@ -33,42 +26,35 @@ __logger = logging.getLogger(__name__)
 TITLE = """doc-rag API"""
 DESCRIPTION = """This API powers doc-rag."""
 
-DOCUMENT_MODELS = [
-    UserDB,
-    Resource,
-    PDFResource,
-    WebpageResource,
-    Chunk,
-    PDFChunk,
-    WebpageChunk,
-]
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initializes application services."""
 
-    app.mongodb_client = AsyncIOMotorClient(CONFIG.mongo.uri)
+    app.mongodb_client = await init_database()
     app.db = app.mongodb_client.get_database(CONFIG.mongo.db_name)
 
-    try:
-        ping_response = await app.db.command("ping")
-    except ServerSelectionTimeoutError:
-        raise Exception("Timeout while connecting to MongoDB.")
+    await VECTOR_STORE.create_index()
+    __logger.info("Vector index created successfully")
 
-    if int(ping_response["ok"]) != 1:
-        raise Exception("Could not connect to MongoDB.")
+    if CONFIG.mongo.search_hybrid_enabled:
+        await create_lexical_index()
+        __logger.info("Lexical index created successfully")
 
-    __logger.info("MongoDB connection initialized successfully")
+    await PARSER_POOL.start()
+    __logger.info("PDF parser pool started successfully")
 
-    await init_beanie(app.db, document_models=DOCUMENT_MODELS)
-    __logger.info("Beanie initialized successfully")
-    
-    await create_search_index()
-    __logger.info("Search index created successfully")
+    await INGESTION_QUEUE.start()
+    __logger.info("Ingestion workers started successfully")
 
     yield
 
+    await INGESTION_QUEUE.stop()
+    __logger.info("Ingestion workers stopped")
+
+    PARSER_POOL.stop()
+    __logger.info("PDF parser pool stopped")
+
     app.mongodb_client.close()
     __logger.info("MongoDB connection closed")
 
@@ -79,6 +65,13 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Added first, so CORS headers are set on its rejections as well
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/resources/pdf",
+    max_bytes=CONFIG.storage.max_upload_bytes,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=CONFIG.allow_origins,
@@ -91,3 +84,5 @@ app.include_router(AuthRouter)
 app.include_router(UsersRouter)
 app.include_router(ResourcesRouter)
 app.include_router(ChatRouter)
+app.include_router(SearchRouter)
+app.include_router(MetricsRouter)
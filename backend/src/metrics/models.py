@@ -0,0 +1,45 @@
+from pydantic import BaseModel, computed_field
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+
+    @computed_field
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class BatchStats(BaseModel):
+    batches: int = 0
+    items: int = 0
+    max_batch_size: int = 0
+    total_queue_delay_ms: float = 0.0
+    max_queue_delay_ms: float = 0.0
+
+    @computed_field
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    @computed_field
+    @property
+    def mean_queue_delay_ms(self) -> float:
+        return self.total_queue_delay_ms / self.items if self.items else 0.0
+
+    def record(self, size: int, queue_delays_ms: list[float]) -> None:
+        """Count a sent batch and the time its items waited for it."""
+        self.batches += 1
+        self.items += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.total_queue_delay_ms += sum(queue_delays_ms)
+        self.max_queue_delay_ms = max(self.max_queue_delay_ms, *queue_delays_ms)
+
+
+class Metrics(BaseModel):
+    embedding_cache: CacheStats
+    query_cache: CacheStats
+    retrieval_cache: CacheStats
+    query_batcher: BatchStats
@@ -0,0 +1,32 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from src.auth.dependencies import current_user
+from src.metrics.models import Metrics
+from src.nlp.embeddingcache import EMBEDDING_CACHE
+from src.nlp.querybatcher import QUERY_BATCHER
+from src.nlp.querycache import QUERY_CACHE
+from src.nlp.retrievalcache import RETRIEVAL_CACHE
+from src.users.models import UserDB
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics(user: Annotated[UserDB, Depends(current_user)]) -> Metrics:
+    """Return performance counters of this API process.
+
+    Args:
+        user (UserDB): The authenticated user making the request.
+
+    Returns:
+        Metrics: Hit/miss counters of the caches and query batch sizes and delays.
+    """
+    return Metrics(
+        embedding_cache=EMBEDDING_CACHE.stats,
+        query_cache=QUERY_CACHE.stats,
+        retrieval_cache=RETRIEVAL_CACHE.stats,
+        query_batcher=QUERY_BATCHER.stats,
+    )
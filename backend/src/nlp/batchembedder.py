@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+__logger = logging.getLogger(__name__)
+
+
+async def _retry(
+    func: Callable[[], Awaitable[List[List[float]]]],
+    max_retries: int,
+    retry_backoff: float,
+) -> List[List[float]]:
+    for attempt in range(max_retries + 1):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+
+            delay = retry_backoff * 2**attempt
+            __logger.warning(
+                f"Embedding batch failed ({e!r}), retrying in {delay:.1f}s "
+                f"({attempt + 1}/{max_retries})"
+            )
+            await asyncio.sleep(delay)
+
+
+class BatchEmbedder:
+    def __init__(self,
+                 client: Embeddings,
+                 batch_size: int,
+                 max_concurrency: int,
+                 max_retries: int,
+                 retry_backoff: float):
+        """
+        Embed large lists of texts as bounded, retried batches.
+
+        The concurrency limit is shared by all callers of the same instance,
+        so concurrent documents cannot monopolise the embedding server.
+
+        :param client: Embedding client used for every batch.
+        :param batch_size: Maximum number of texts sent in one request.
+        :param max_concurrency: Maximum number of batches in flight.
+        :param max_retries: Number of retries of a failed batch.
+        :param retry_backoff: Initial retry delay in seconds, doubled on every retry.
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        async def attempt() -> List[List[float]]:
+            async with self._semaphore:
+                return await self.client.aembed_documents(texts)
+
+        return await _retry(attempt, self.max_retries, self.retry_backoff)
+
+    async def embed(
+        self,
+        texts: List[str],
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_batch: Optional[Callable[[List[str], List[List[float]]], Awaitable[None]]] = None,
+    ) -> List[List[float]]:
+        """
+        Embed texts batch-wise, preserving their order.
+
+        :param texts: Texts to embed.
+        :param on_progress: Awaited with the number of embedded texts after every batch.
+        :param on_batch: Awaited with the texts and embeddings of every completed batch.
+        :return: One embedding vector per text.
+        """
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        done = 0
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            nonlocal done
+            embeddings = await self._embed_batch(batch)
+            if on_batch is not None:
+                await on_batch(batch, embeddings)
+            done += len(batch)
+            if on_progress is not None:
+                await on_progress(done)
+            return embeddings
+
+        tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return [embedding for batch in results for embedding in batch]
@@ -0,0 +1,115 @@
+import hashlib
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+
+from src.config import CONFIG
+from src.metrics.models import CacheStats
+from src.nlp.vectors import from_bson_vector, to_bson_vector
+from src.resources.models import EmbeddingCacheEntry
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str):
+        """
+        Persistent embedding cache keyed by model name and a hash of the exact input text.
+
+        Entries live in the `embedding_cache` collection and are shared across
+        resources and users. Every hit refreshes the entry's `last_used_at`,
+        so the TTL index evicts the least recently used entries.
+
+        :param model_name: Name of the embedding model the vectors belong to.
+        """
+        self.model_name = model_name
+        self.stats = CacheStats()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def _lookup(self, keys: List[str]) -> dict[str, np.ndarray]:
+        collection = EmbeddingCacheEntry.get_pymongo_collection()
+        query = {"model": self.model_name, "key": {"$in": keys}}
+
+        entries = await collection.find(
+            query, {"_id": 0, "key": 1, "embedding": 1}
+        ).to_list()
+
+        if entries:
+            query["key"]["$in"] = [entry["key"] for entry in entries]
+            await collection.update_many(query, {"$set": {"last_used_at": datetime.now()}})
+
+        return {entry["key"]: from_bson_vector(entry["embedding"]) for entry in entries}
+
+    async def _store(self, entries: dict[str, List[float]]) -> None:
+        collection = EmbeddingCacheEntry.get_pymongo_collection()
+        now = datetime.now()
+
+        await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"model": self.model_name, "key": key},
+                    {
+                        "$setOnInsert": {"embedding": to_bson_vector(embedding)},
+                        "$set": {"last_used_at": now},
+                    },
+                    upsert=True,
+                )
+                for key, embedding in entries.items()
+            ],
+            ordered=False,
+        )
+
+    async def embed(
+        self,
+        texts: List[str],
+        embed: Callable[..., Awaitable[List[List[float]]]],
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> List[List[float]]:
+        """
+        Embed texts, only passing cache misses to the embedding function.
+
+        Identical texts are embedded once, even within a single call. Every
+        completed batch is stored right away, so an interrupted call loses
+        at most the batches in flight.
+
+        :param texts: Texts to embed.
+        :param embed: Batch embedding function for the missing texts, called
+                      with `on_progress` and `on_batch`.
+        :param on_progress: Awaited with the number of embedded texts.
+        :return: One embedding vector per text.
+        """
+        keys = [self.key(text) for text in texts]
+        cached = await self._lookup(list(set(keys)))
+
+        hits = sum(1 for key in keys if key in cached)
+        self.stats.hits += hits
+        self.stats.misses += len(keys) - hits
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+
+        if missing:
+            async def on_embed_progress(embedded: int) -> None:
+                if on_progress is not None:
+                    await on_progress(hits + embedded)
+
+            async def on_batch(batch: List[str], embeddings: List[List[float]]) -> None:
+                await self._store(
+                    {self.key(text): embedding for text, embedding in zip(batch, embeddings)}
+                )
+
+            embeddings = await embed(
+                list(missing.values()), on_progress=on_embed_progress, on_batch=on_batch
+            )
+            cached.update(zip(missing.keys(), embeddings))
+
+        if on_progress is not None:
+            await on_progress(len(texts))
+
+        return [cached[key] for key in keys]
+
+
+EMBEDDING_CACHE = EmbeddingCache(model_name=CONFIG.embedding_client.model_name)
+"""Global embedding cache for the configured embedding model."""
@@ -1,36 +1,50 @@
-import base64
-import io
-import zlib
+import asyncio
+import hashlib
 import json
-import pandas as pd
+from collections import deque
+
+import numpy as np
 from beanie import PydanticObjectId
-from pymongo.operations import SearchIndexModel
-from pymongo.errors import OperationFailure
 # from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
-from langchain_mongodb.pipelines import vector_search_stage
-from langchain_text_splitters import TokenTextSplitter
-from langchain_unstructured import UnstructuredLoader
 from fastapi import HTTPException, status
-from typing import Union, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, List, Optional, Sequence
 
 # import nltk
 from src.config import CONFIG
+from src.nlp.batchembedder import BatchEmbedder
 from src.nlp.clients import EMBEDDING_CLIENT
+from src.nlp.embeddingcache import EMBEDDING_CACHE
+from src.nlp.lexicalsearch import lexical_search, reciprocal_rank_fusion
 from src.nlp.mmr import MMRSelector
-from src.nlp.textcleaner import TextCleaner
-from src.resources.models import Chunk, PDFChunk
+from src.nlp.pdfparser import (
+    PARSER_OPTIONS,
+    PARSER_POOL,
+    ParsedWindow,
+    count_pages,
+    parse_pdf_window,
+)
+from src.nlp.querybatcher import QUERY_BATCHER
+from src.nlp.querycache import QUERY_CACHE
+from src.nlp.resourcesummaries import RESOURCE_SUMMARIES
+from src.nlp.retrievalcache import RETRIEVAL_CACHE
+from src.nlp.searchplan import CHUNK_COUNTS, SearchPlan, plan_vector_search
+from src.nlp.vectors import (
+    cosine_similarities,
+    from_bson_vector,
+    rank_stacked_summaries,
+    spherical_kmeans,
+    truncate_vector,
+)
+from src.nlp.vectorstore import VECTOR_STORE
+from src.resources.models import Chunk
+from src.users.database import get_library_version
 
 # __PDF_SPLITTER = RecursiveCharacterTextSplitter(
 #     chunk_size=CONFIG.embedding_client.chunk_size,
 #     chunk_overlap=CONFIG.embedding_client.chunk_overlap,
 #     length_function=len,
 # )
-__PDF_SPLITTER = TokenTextSplitter(
-    chunk_size=CONFIG.embedding_client.chunk_size,
-    chunk_overlap=CONFIG.embedding_client.chunk_overlap,
-    encoding_name="cl100k_base",
-)
 
 __MMR_SELECTOR = MMRSelector(
     final_k=CONFIG.embedding_client.mmr_final_k,
@@ -38,9 +52,21 @@ __MMR_SELECTOR = MMRSelector(
     similarity_threshold=CONFIG.embedding_client.mmr_similarity_threashold
 )
 
-__TEXT_CLEANER = TextCleaner(
-    take=CONFIG.embedding_client.textcleaner_take,
-    min_ratio=CONFIG.embedding_client.textcleaner_ratio
+__BATCH_EMBEDDER = BatchEmbedder(
+    client=EMBEDDING_CLIENT,
+    batch_size=CONFIG.embedding_client.embed_batch_size,
+    max_concurrency=CONFIG.embedding_client.embed_max_concurrency,
+    max_retries=CONFIG.embedding_client.embed_max_retries,
+    retry_backoff=CONFIG.embedding_client.embed_retry_backoff,
+)
+
+# Separate from the ingestion embedder, so batch searches never wait for ingestion batches
+__QUERY_EMBEDDER = BatchEmbedder(
+    client=EMBEDDING_CLIENT,
+    batch_size=CONFIG.embedding_client.embed_batch_size,
+    max_concurrency=CONFIG.embedding_client.query_embed_max_concurrency,
+    max_retries=CONFIG.embedding_client.embed_max_retries,
+    retry_backoff=CONFIG.embedding_client.embed_retry_backoff,
 )
 
 # nltk.download('punkt')
@@ -67,217 +93,203 @@ __TEXT_CLEANER = TextCleaner(
 # __PDF_SPLITTER = SentenceTextSplitter(sentences_per_chunk=12, overlap=2)
 
 
-def html_to_markdown(html_str: str) -> str:
-    """Converts one or multiple HTML table strings to clean Markdown."""
-    try:
-        # pd.read_html returns a list of DataFrames for all <table> tags found
-        dfs = pd.read_html(io.StringIO(html_str))
-        if not dfs:
-            return ""
-        
-        # Join multiple tables with double newlines
-        return "\n\n".join([df.to_markdown(index=False) for df in dfs])
-    except Exception:
-        # If conversion fails, return the raw text to avoid losing data
-        return html_str
+def ingestion_fingerprint() -> str:
+    """Identify the parser and embedding configuration chunks are produced with.
 
+    Chunks of resources with the same file hash and fingerprint are interchangeable.
 
-async def create_search_index():
-    """Create a search index for the Chunk collection.
-    This function checks if the search index already exists, and if not, it creates one.
-    If the collection does not exist, it creates a dummy document to initialize the collection first.
+    Returns:
+        str: SHA-256 digest of the relevant configuration.
+    """
+    configuration = {
+        "parser": PARSER_OPTIONS,
+        "router": [
+            CONFIG.ingestion.text_layer_min_chars,
+            CONFIG.ingestion.text_layer_min_alnum_ratio,
+            CONFIG.ingestion.layout_strategy,
+        ],
+        "splitter": [
+            CONFIG.embedding_client.chunk_size,
+            CONFIG.embedding_client.chunk_overlap,
+        ],
+        "textcleaner": [
+            CONFIG.embedding_client.textcleaner_take,
+            CONFIG.embedding_client.textcleaner_ratio,
+        ],
+        "window_pages": CONFIG.ingestion.window_pages,
+        "embedding_model": CONFIG.embedding_client.model_name,
+        "ann_dimensions": CONFIG.mongo.search_index_ann_dimensions,
+    }
+    serialized = json.dumps(configuration, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def ann_embedding(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    """Derive the truncated embedding indexed for the first search stage.
 
-    Raises:
-        OperationFailure: If there is an error creating the search index.
+    Args:
+        embedding (Sequence[float]): The full embedding.
+
+    Returns:
+        np.ndarray | None: The re-normalised prefix of the configured
+            dimensions, or None if the full embeddings are indexed.
     """
-    # collection = Chunk.get_motor_collection()
-    collection = Chunk.get_pymongo_collection()
-    indexes = await collection.list_search_indexes().to_list()
-
-    if len(indexes) > 0 and indexes[-1]["name"] == "embedding_index":
-        return
-
-    search_index_model = SearchIndexModel(
-        definition={
-            "fields": [
-                {
-                    "type": "vector",
-                    "numDimensions": CONFIG.mongo.search_index_dimensions,
-                    "path": CONFIG.mongo.search_index_field,
-                    "similarity": CONFIG.mongo.search_index_similarity,
-                },
-                {
-                    "type": "filter",
-                    "path": "user",
-                },
-                {
-                    "type": "filter",
-                    "path": "resource",
-                },
-            ]
-        },
-        name=CONFIG.mongo.search_index_name,
-        type="vectorSearch",
-    )
+    if not CONFIG.mongo.search_index_ann_dimensions:
+        return None
 
-    try:
-        await collection.create_search_index(search_index_model)
-        return
+    return truncate_vector(embedding, CONFIG.mongo.search_index_ann_dimensions)
 
-    except OperationFailure as e:
-        if e.details.get("codeName") != "NamespaceNotFound":
-            raise e
 
-    # Insert a dummy document to create the collection
-    result = await collection.insert_one({})
-    await collection.delete_one({"_id": result.inserted_id})
+async def summarize_resource(resource_id: PydanticObjectId) -> list[np.ndarray]:
+    """Compute summary vectors of a resource from the embeddings of its chunks.
 
-    # Retry creating the search index
-    await collection.create_search_index(search_index_model)
+    The chunk embeddings are clustered into up to `resource_summary_vectors`
+    centroids, so resources covering several topics are summarized by several
+    vectors.
 
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource.
 
-# async def split_pdf(file_path: str) -> tuple[list[Document], int]:
-#     """Create raw chunks for a PDF file.
+    Returns:
+        list[np.ndarray]: The summary vectors, empty if the resource has no chunks.
+    """
+    field = CONFIG.mongo.search_index_field
+    chunks = await Chunk.get_pymongo_collection().find(
+        {"resource": resource_id}, {field: 1}
+    ).to_list()
+    if not chunks:
+        return []
 
-#     Args:
-#         file_path (str): Path to the PDF file.
+    vectors = np.stack([from_bson_vector(chunk[field]) for chunk in chunks])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
 
-#     Returns:
-#         tuple[list[Document], int]: A tuple containing the raw chunks and the total number of pages.
-#     """
-#     loader = PyPDFLoader(file_path)
-#     pages = await loader.aload()
+    return list(spherical_kmeans(vectors / norms, CONFIG.mongo.resource_summary_vectors))
+
+
+async def select_resources(
+    query_embedding: List[float], user_id: PydanticObjectId, library_version: int
+) -> Optional[List[PydanticObjectId]]:
+    """Pick the resources of a user whose summary vectors are closest to a query.
+
+    Resources without summary vectors, e.g. still being ingested, are always
+    included.
+
+    Args:
+        query_embedding (list[float]): The query embedding.
+        user_id (PydanticObjectId): The ID of the user.
+        library_version (int): The version of the user's library read by the search.
 
+    Returns:
+        list[PydanticObjectId] | None: The IDs of the selected resources, or
+            None if the user has no more than `search_top_resources` resources.
+    """
+    summaries = await RESOURCE_SUMMARIES.get(user_id, library_version)
+    total = len(summaries.unsummarized) + len(summaries.summarized)
 
-#     # Clean page contents and ensure page metadata
-#     raw_page_texts = [p.page_content for p in pages]
-#     cleaned_texts = __TEXT_CLEANER.clean_pages(raw_page_texts)
-#     for i, p in enumerate(pages):
-#         p.page_content = cleaned_texts[i]
-#         # ensure 1-based page number is present
-#         p.metadata["page"] = p.metadata.get("page", i + 1)
+    if total <= CONFIG.mongo.search_top_resources:
+        return None
 
-#     if not pages:
-#         raise HTTPException(
-#             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-#             detail="The PDF file is empty or could not be loaded.",
-#         )
+    selected = list(summaries.unsummarized)
+
+    if summaries.summarized:
+        best = rank_stacked_summaries(
+            query_embedding,
+            summaries.vectors,
+            summaries.owners,
+            len(summaries.summarized),
+            CONFIG.mongo.search_top_resources,
+        )
+        selected += [summaries.summarized[i] for i in best]
 
-#     total_pages = pages[0].metadata.get("total_pages", 0)
-#     raw_chunks = __PDF_SPLITTER.split_documents(pages)
+    return selected
 
-#     return raw_chunks, total_pages
 
-async def split_pdf(file_path: str) -> tuple[list[Document], int]:
-    """Create raw chunks for a PDF file using the modern langchain_unstructured loader.
+async def count_pdf_pages(file_path: str) -> int:
+    """Count the pages of a PDF file in the parser pool.
 
     Args:
         file_path (str): Path to the PDF file.
 
     Returns:
-        tuple[list[Document], int]: A tuple containing the raw chunks and the total number of pages.
+        int: The number of pages.
     """
-    # Initialize the modern UnstructuredLoader
-    loader = UnstructuredLoader(
-        file_path=file_path,
-        strategy="fast",
-        partition_via_api=False,
-        infer_table_structure=True,   # Critical for keeping tables together
-        languages=["deu", "eng"],
-        skip_infer_table_types=["Header", "Footer"],
-        
-        # --- THE FIX: NATIVE CHUNKING ---
-        chunking_strategy="by_title",   # Groups elements logically under headings
-        max_characters=2000,            # Target size for each chunk
-        combine_text_under_n_chars=500, # Merges small snippets into the next chunk
-        multipage_sections=True,        # Allows chunks to span across pages if logical
-        multiprocessing_context="fork", # or "spawn" depending on OS
-        max_partitionbatch_size=5,      # Process in batches of 5 pages
-        workers=4,                      # Use 4 CPU cores
-    )
-
     try:
-        # langchain_unstructured supports async aload natively
-        chunks = await loader.aload()
-    except Exception as e:
-        # Catch errors if local dependencies (tesseract/poppler) are missing
+        return await PARSER_POOL.run(count_pages, file_path)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process PDF with Unstructured: {str(e)}",
+            detail=str(e),
         )
 
-    if not chunks:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="The PDF file is empty or could not be loaded.",
-        )
 
-    max_page = 0
+async def iter_pdf_windows(
+    file_path: str, total_pages: int, first_page: int = 1
+) -> AsyncIterator[ParsedWindow]:
+    """Create raw chunks for a PDF file window by window.
 
-    # return chunks, max_page
-    for chunk in chunks:
-        current_page = chunk.metadata.get("page_number", 1)
-        chunk.metadata["page"] = current_page
-        max_page = max(max_page, current_page)
+    Parsing and cleaning run in the parser pool, off the event loop. Up to
+    `window_prefetch` windows are parsed concurrently, and windows are
+    yielded in page order.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        total_pages (int): The number of pages of the PDF file.
+        first_page (int): The page to start at (1-based).
+
+    Yields:
+        ParsedWindow: Page range, raw chunks (as Documents) and parse path counts of a window.
+    """
+    window_pages = CONFIG.ingestion.window_pages
+    windows = iter(
+        (page, min(page + window_pages - 1, total_pages))
+        for page in range(first_page, total_pages + 1, window_pages)
+    )
+    pending = deque()
+
+    def submit_next_window() -> None:
+        window = next(windows, None)
+        if window is not None:
+            pending.append(
+                asyncio.ensure_future(parse_pdf_window(file_path, *window))
+            )
+
+    for _ in range(CONFIG.ingestion.window_prefetch):
+        submit_next_window()
+
+    try:
+        while pending:
+            task = pending.popleft()
 
-        # 1. Check for compressed 'orig_elements'
-        orig_elements_raw = chunk.metadata.get("orig_elements")
-        print(orig_elements_raw)
-        
-        if isinstance(orig_elements_raw, str) and len(orig_elements_raw) > 0:
-            # print("\n\n\n\n\n\n1111111\n\n\n\n\n")
             try:
-                # DECOMPRESS: Unstructured uses Gzip + Base64 for serialization
-                decoded_bytes = base64.b64decode(orig_elements_raw)
-                decompressed_bytes = zlib.decompress(decoded_bytes)
-                elements_list = json.loads(decompressed_bytes)
-                
-                reconstructed_parts = []
-                for el in elements_list:
-                    # 'el' is now a dictionary
-                    category = el.get("type")
-                    el_metadata = el.get("metadata", {})
-                    
-                    if category == "Table" and "text_as_html" in el_metadata:
-                        # Convert table to markdown
-                        markdown = html_to_markdown(el_metadata["text_as_html"])
-                        # reconstructed_parts.append(__TEXT_CLEANER.clean_chunk_text(markdown, table=True))
-                        # print("md---->", markdown)
-                        reconstructed_parts.append(markdown)
-                    else:
-                        # Clean normal text lines using your TextCleaner
-                        text = el.get("text", "")
-                        # cleaned_text = __TEXT_CLEANER.clean_chunk_text(text)
-                        if text.strip():
-                            reconstructed_parts.append(text)
-                        # print("text---->", text)
-                
-                reconstructed_text = "\n".join(reconstructed_parts)
-
-                chunk.page_content = __TEXT_CLEANER.clean_chunk_text(reconstructed_text)
-                # print(chunk.page_content)
-                continue # Move to next chunk
-                
-            except Exception as e:
-                # print("\n\n\n\n\n\n-----------------\n\n\n\n\n")
-                print(f"Decompression failed: {e}")
-                # If decompression fails, we fall through to standard cleaning
-
-        # 2. Fallback: Top-level Table check
-        if chunk.metadata.get("category") == "Table" and "text_as_html" in chunk.metadata:
-            # print("\n\n\n\n\n\n222222\n\n\n\n\n")
-            markdown = html_to_markdown(chunk.metadata["text_as_html"])
-            chunk.page_content = __TEXT_CLEANER.clean_chunk_text(markdown, table=True)
-        else:
-            # 3. Fallback: Standard text cleaning
-            # print("\n\n\n\n\n\n333333\n\n\n\n\n")
-            chunk.page_content = __TEXT_CLEANER.clean_chunk_text(chunk.page_content)
-            print(chunk.page_content)
+                window = await task
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=str(e),
+                )
+
+            submit_next_window()
+            yield window._replace(chunks=[Document(**chunk) for chunk in window.chunks])
+
+    finally:
+        for task in pending:
+            task.cancel()
 
-    return chunks, max_page
 
+async def embed_chunks(
+    raw_chunks: list[Document],
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> list[list[float]]:
+    """Create embedding vectors for the raw chunks in bounded batches.
 
-async def embed_chunks(raw_chunks: list[Document]) -> list[list[float]]:
+    Args:
+        raw_chunks (list[Document]): List of raw chunks from the PDF.
+        on_progress (Callable, optional): Awaited with the number of embedded chunks after every batch.
+
+    Returns:
+        list[list[float]]: List of embedding vectors for each chunk.
+    """
     contents = []
     for chunk in raw_chunks:
         category = chunk.metadata.get("category", "text")
@@ -286,8 +298,13 @@ async def embed_chunks(raw_chunks: list[Document]) -> list[list[float]]:
         # Help the LLM identify tables during retrieval
         prefix = f"[Source: Page {page}, Type: {category}]"
         contents.append(f"{prefix}\n{chunk.page_content}")
-        
-    return await EMBEDDING_CLIENT.aembed_documents(contents)
+
+    if CONFIG.embedding_client.embed_cache_enabled:
+        return await EMBEDDING_CACHE.embed(
+            contents, __BATCH_EMBEDDER.embed, on_progress=on_progress
+        )
+
+    return await __BATCH_EMBEDDER.embed(contents, on_progress=on_progress)
 
 # async def embed_chunks(raw_chunks: list[Document]) -> list[list[float]]:
 #     """Create embedding vectors for the raw chunks.
@@ -411,75 +428,249 @@ async def embed_chunks(raw_chunks: list[Document]) -> list[list[float]]:
 
 #     return chunks
 
-async def similarity_search(
+
+class RetrievedChunk(NamedTuple):
+    id: PydanticObjectId
+    resource: PydanticObjectId
+    content: str
+    page_number: Optional[int]
+    score: float
+
+
+def _format_query(query: str) -> str:
+    return f"task: search result | query: {query}"
+
+
+async def embed_queries(queries: List[str]) -> list[np.ndarray]:
+    """Embed many search queries in batches, reusing cached query embeddings.
+
+    Args:
+        queries (list[str]): The query strings.
+
+    Returns:
+        list[np.ndarray]: One embedding per query.
+    """
+    formatted = [_format_query(query) for query in queries]
+    cache_enabled = CONFIG.embedding_client.query_cache_enabled
+    embeddings = {text: QUERY_CACHE.get(text) for text in formatted} if cache_enabled else {}
+
+    missing = [text for text in dict.fromkeys(formatted) if embeddings.get(text) is None]
+    if missing:
+        for text, embedding in zip(missing, await __QUERY_EMBEDDER.embed(missing)):
+            if cache_enabled:
+                embeddings[text] = QUERY_CACHE.put(text, embedding)
+            else:
+                embeddings[text] = np.asarray(embedding, dtype=np.float32)
+
+    return [embeddings[text] for text in formatted]
+
+
+async def _search_chunks(
     query: str,
     user_id: PydanticObjectId,
-    resource_ids: Optional[List[PydanticObjectId]]
-) -> list[Union[PDFChunk, Chunk]]:
-    """Perform a similarity search for the given query."""
-    formatted_query = f"task: search result | query: {query}"
-    query_embedding = await EMBEDDING_CLIENT.aembed_query(formatted_query)
-
-    pre_filter = {"user": user_id}
-    if resource_ids:
-        pre_filter["resource"] = {"$in": resource_ids}
-
-    search_stage = vector_search_stage(
-        query_embedding,
-        CONFIG.mongo.search_index_field,
-        CONFIG.mongo.search_index_name,
-        CONFIG.mongo.search_top_k,
-        pre_filter,
+    resource_ids: Optional[List[PydanticObjectId]],
+    library_version: int,
+    query_embedding: Optional[np.ndarray] = None,
+) -> list[RetrievedChunk]:
+    """Embed the query if needed, search the vector store and select the chunks for the prompt.
+
+    Only the fields used by the chat prompt are returned, plus the
+    embeddings if MMR is enabled or the index is quantized or truncated.
+    Candidates from such an index are over-fetched and rescored with the
+    full-precision, full-length embeddings. Without resource IDs, the search
+    is restricted to the `search_top_resources` resources with the closest
+    summary vectors if configured. The number of candidates, or an exact
+    search, is chosen by the number of chunks in scope. In hybrid mode, a
+    lexical search runs concurrently and both rankings are merged by
+    reciprocal rank fusion before the selection.
+
+    Args:
+        query (str): The query string to search for.
+        user_id (PydanticObjectId): The ID of the user making the request.
+        resource_ids (list[PydanticObjectId]): List of resource IDs to search within. (Optional)
+        library_version (int): The version of the user's library read by the search.
+        query_embedding (np.ndarray): Precomputed embedding of the query. (Optional)
+
+    Returns:
+        list[RetrievedChunk]: The selected chunks, most relevant first.
+    """
+    if query_embedding is None:
+        formatted_query = _format_query(query)
+        if CONFIG.embedding_client.query_cache_enabled:
+            query_embedding = await QUERY_CACHE.embed(formatted_query, QUERY_BATCHER.embed)
+        else:
+            query_embedding = await QUERY_BATCHER.embed(formatted_query)
+
+    # Restrict the chunk search to the resources closest to the query
+    if not resource_ids and CONFIG.mongo.search_top_resources:
+        resource_ids = await select_resources(query_embedding, user_id, library_version)
+
+    truncated = bool(CONFIG.mongo.search_index_ann_dimensions)
+    rescore = truncated or VECTOR_STORE.approximate_scores
+    top_k = CONFIG.mongo.search_top_k
+
+    # Scores of quantized or truncated vectors are approximate,
+    # so more candidates are fetched and rescored
+    limit = top_k * CONFIG.mongo.search_rescore_factor if rescore else top_k
+
+    mmr_enabled = CONFIG.embedding_client.mmr_enabled
+    hybrid = CONFIG.mongo.search_hybrid_enabled
+    projection = {"resource": 1, "content": 1, "page_number": 1}
+    if mmr_enabled or rescore or hybrid:
+        projection[CONFIG.mongo.search_index_field] = 1
+
+    # Size the search to the number of chunks passing the prefilter
+    plan = SearchPlan(limit=limit, num_candidates=None, exact=False)
+    if CONFIG.mongo.search_adaptive_candidates:
+        plan = plan_vector_search(
+            await CHUNK_COUNTS.scope_size(user_id, library_version, resource_ids),
+            await CHUNK_COUNTS.total(),
+            limit,
+        )
+
+    # The search scores serve as relevance for both the threshold and MMR
+    vector_search = VECTOR_STORE.search(
+        ann_embedding(query_embedding) if truncated else query_embedding,
+        user_id,
+        resource_ids,
+        plan.limit,
+        projection,
+        num_candidates=plan.num_candidates,
+        exact=plan.exact,
     )
+    if hybrid:
+        (results, relevance), lexical_results = await asyncio.gather(
+            vector_search,
+            lexical_search(
+                query, user_id, resource_ids, CONFIG.mongo.search_lexical_top_k, projection
+            ),
+        )
+    else:
+        results, relevance = await vector_search
 
-    pipeline = [search_stage]
+    if rescore and results:
+        # Rescore against the full-precision vectors and keep the best candidates
+        doc_vecs = np.stack(
+            [from_bson_vector(r[CONFIG.mongo.search_index_field]) for r in results]
+        )
+        relevance = cosine_similarities(query_embedding, doc_vecs)
+        best = np.argsort(-relevance, kind="stable")[:top_k]
+        results = [results[i] for i in best]
+        relevance = relevance[best]
 
-    collection = Chunk.get_pymongo_collection()
-    results = await collection.aggregate(pipeline).to_list()
+    if hybrid:
+        results = reciprocal_rank_fusion(
+            [results, lexical_results], CONFIG.mongo.search_rrf_k
+        )[:top_k]
 
-    # Prepare vectors for MMR
-    indexed = [
-        (idx, r)
-        for idx, r in enumerate(results)
-        if isinstance(r.get("embedding"), list)
-    ]
-    if not indexed:
+    if not results:
         return []
 
-    doc_vecs = [r["embedding"] for _, r in indexed]
+    if mmr_enabled or rescore or hybrid:
+        doc_vecs = np.stack(
+            [from_bson_vector(r[CONFIG.mongo.search_index_field]) for r in results]
+        )
 
-    # Compute cosine similarities and threshold
-    relevances = [__MMR_SELECTOR._cosine(query_embedding, v) for v in doc_vecs]
-    filtered = [
-        (i, r, s)
-        for (i, r), s in zip(indexed, relevances)
-        if s >= CONFIG.embedding_client.mmr_similarity_threashold
+    threshold = CONFIG.embedding_client.mmr_similarity_threashold
+    exempt = np.zeros(len(results), dtype=bool)
+
+    if hybrid:
+        # Lexical matches have no vector score, so all fused candidates get their exact one
+        relevance = cosine_similarities(query_embedding, doc_vecs)
+
+        # Exact term matches may score low by cosine, so they bypass the threshold
+        lexical_ids = {r["_id"] for r in lexical_results}
+        exempt = np.array([r["_id"] in lexical_ids for r in results], dtype=bool)
+
+    if mmr_enabled:
+        selected_indices = __MMR_SELECTOR.select(query_embedding, doc_vecs, relevance, exempt)
+    else:
+        # Results are sorted by score, or by fused rank in hybrid mode
+        selected_indices = [
+            i for i, s in enumerate(relevance) if s >= threshold or exempt[i]
+        ][: CONFIG.embedding_client.mmr_final_k]
+
+    return [
+        RetrievedChunk(
+            id=results[i]["_id"],
+            resource=results[i]["resource"],
+            content=results[i]["content"],
+            page_number=results[i].get("page_number"),
+            score=float(relevance[i]),
+        )
+        for i in selected_indices
     ]
-    if not filtered:
-        return []
 
-    # Run MMR on filtered docs
-    filtered_doc_vecs = [r["embedding"] for _, r, _ in filtered]
-    selected_rel_indices = __MMR_SELECTOR.select(query_embedding, filtered_doc_vecs)
-    if not selected_rel_indices:
-        return []
 
-    # Build chunks only from the MMR-selected docs (in selected order)
-    chunks: list[Union[PDFChunk, Chunk]] = []
-    for sel_idx in selected_rel_indices:
-        _, result, _ = filtered[sel_idx]
+async def _load_chunks(
+    user_id: PydanticObjectId, selected: list[tuple[PydanticObjectId, float]]
+) -> list[RetrievedChunk]:
+    """Load the chunks of a cached search result, keeping its order and scores.
 
-        # Normalize id field if needed
-        if "_id" in result and "id" not in result:
-            result["id"] = result.pop("_id")
+    Args:
+        user_id (PydanticObjectId): The ID of the user owning the chunks.
+        selected (list[tuple[PydanticObjectId, float]]): IDs and scores of the chunks.
 
-        try:
-            if "page_number" in result:
-                chunks.append(PDFChunk(**result))
-            else:
-                chunks.append(Chunk(**result))
-        except Exception as e:
-            print(f"Error creating chunk: {e}")
-            continue
+    Returns:
+        list[RetrievedChunk]: The chunks that still exist.
+    """
+    documents = await Chunk.get_pymongo_collection().find(
+        {"_id": {"$in": [chunk_id for chunk_id, _ in selected]}, "user": user_id},
+        {"resource": 1, "content": 1, "page_number": 1},
+    ).to_list()
+    by_id = {document["_id"]: document for document in documents}
+
+    return [
+        RetrievedChunk(
+            id=chunk_id,
+            resource=by_id[chunk_id]["resource"],
+            content=by_id[chunk_id]["content"],
+            page_number=by_id[chunk_id].get("page_number"),
+            score=score,
+        )
+        for chunk_id, score in selected
+        if chunk_id in by_id
+    ]
+
+
+async def similarity_search(
+    query: str,
+    user_id: PydanticObjectId,
+    resource_ids: Optional[List[PydanticObjectId]],
+    query_embedding: Optional[np.ndarray] = None,
+) -> list[RetrievedChunk]:
+    """Perform a similarity search for the given query.
+
+    Results are cached per user library version, searched resources and
+    normalised query. A cache hit only loads the selected chunks, skipping
+    the embedding, the vector search and MMR.
+
+    Args:
+        query (str): The query string to search for.
+        user_id (PydanticObjectId): The ID of the user making the request.
+        resource_ids (list[PydanticObjectId]): List of resource IDs to search within. (Optional)
+        query_embedding (np.ndarray): Precomputed embedding of the query, e.g. from
+            `embed_queries`. (Optional)
+
+    Returns:
+        list[RetrievedChunk]: The selected chunks, most relevant first.
+    """
+    # Read once, so the chunk counts, summaries and cached result of a search
+    # all belong to the same version. Results of a library changing during
+    # the search are cached under the outdated version.
+    library_version = await get_library_version(user_id)
+
+    if not CONFIG.mongo.search_cache_enabled:
+        return await _search_chunks(
+            query, user_id, resource_ids, library_version, query_embedding
+        )
+
+    key = RETRIEVAL_CACHE.key(user_id, library_version, resource_ids, query)
+
+    selected = RETRIEVAL_CACHE.get(key)
+    if selected is not None:
+        return await _load_chunks(user_id, selected)
 
-    return chunks
\ No newline at end of file
+    chunks = await _search_chunks(query, user_id, resource_ids, library_version, query_embedding)
+    RETRIEVAL_CACHE.put(key, [(chunk.id, chunk.score) for chunk in chunks])
+    return chunks
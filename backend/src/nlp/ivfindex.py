@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.nlp.vectors import spherical_kmeans
+
+
+# Rows hold the user, the resource and the inverted list of every vector
+_USER, _RESOURCE, _LIST = range(3)
+_DELETED = -1
+
+
+class IVFIndex:
+    def __init__(self, directory: str, dims: int, lists: int, probes: int):
+        """
+        Inverted file index over unit float32 vectors, persisted to memory-mapped files.
+
+        Vectors are appended to `vectors.f32`, their IDs to `ids.bin` and the
+        owning user, resource and inverted list to `rows.i32`. Until enough
+        vectors for training exist, and for owners with few vectors, searches
+        are exact. Afterwards only the `probes` lists closest to the query are
+        scanned. The lists are retrained whenever the index doubled in size.
+        Deleted vectors are tombstoned.
+
+        Not safe for concurrent use by several processes, which
+        `LocalVectorStore` prevents with a lock file.
+
+        :param directory: Directory of the index files.
+        :param dims: Number of dimensions of the vectors.
+        :param lists: Number of inverted lists.
+        :param probes: Number of lists scanned per search.
+        """
+        self.directory = directory
+        self.dims = dims
+        self.lists = lists
+        self.probes = probes
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._state = self._load_state()
+        self._centroids: Optional[np.ndarray] = None
+        if os.path.exists(self._path("centroids.npy")):
+            self._centroids = np.load(self._path("centroids.npy"))
+        self._open()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self._path("state.json")) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {"dims": self.dims, "codes": {}, "trained_rows": 0}
+
+        if state["dims"] != self.dims:
+            raise ValueError(
+                f"The index in {self.directory} has {state['dims']} dimensions, not {self.dims}."
+            )
+        return state
+
+    def _save_state(self) -> None:
+        temp_path = self._path("state.json.part")
+        with open(temp_path, "w") as f:
+            json.dump(self._state, f)
+        os.replace(temp_path, self._path("state.json"))
+
+    def _open(self) -> None:
+        def rows_of(name: str, row_bytes: int) -> int:
+            path = self._path(name)
+            return os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+
+        # Rows of an interrupted append are ignored
+        self.size = min(
+            rows_of("vectors.f32", self.dims * 4),
+            rows_of("ids.bin", 12),
+            rows_of("rows.i32", 12),
+        )
+
+        if self.size == 0:
+            self._vectors = np.empty((0, self.dims), dtype=np.float32)
+            self._ids = np.empty((0, 12), dtype=np.uint8)
+            self._rows = np.empty((0, 3), dtype=np.int32)
+            return
+
+        self._vectors = np.memmap(
+            self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(self.size, self.dims)
+        )
+        self._ids = np.memmap(self._path("ids.bin"), dtype=np.uint8, mode="r", shape=(self.size, 12))
+        self._rows = np.memmap(self._path("rows.i32"), dtype=np.int32, mode="r+", shape=(self.size, 3))
+
+    def _code(self, key: str, create: bool = False) -> Optional[int]:
+        codes = self._state["codes"]
+        if key not in codes and create:
+            codes[key] = len(codes)
+        return codes.get(key)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def add(
+        self,
+        ids: Sequence[bytes],
+        users: Sequence[str],
+        resources: Sequence[str],
+        vectors: np.ndarray,
+    ) -> None:
+        """
+        Append vectors to the index.
+
+        :param ids: 12-byte IDs of the vectors.
+        :param users: Owning user of every vector.
+        :param resources: Owning resource of every vector.
+        :param vectors: Matrix with one vector per row, normalised on insert.
+        """
+        if len(ids) == 0:
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        with self._lock:
+            rows = np.empty((len(ids), 3), dtype=np.int32)
+            rows[:, _USER] = [self._code(f"user:{u}", create=True) for u in users]
+            rows[:, _RESOURCE] = [self._code(f"resource:{r}", create=True) for r in resources]
+            rows[:, _LIST] = self._assign(vectors)
+
+            self._save_state()
+            for name, data in (
+                ("vectors.f32", vectors.astype("<f4").tobytes()),
+                ("ids.bin", b"".join(ids)),
+                ("rows.i32", rows.astype("<i4").tobytes()),
+            ):
+                with open(self._path(name), "ab") as f:
+                    f.write(data)
+
+            self._open()
+
+            if self.size >= max(self.lists * 40, 2 * self._state["trained_rows"]):
+                self._train()
+
+    def delete_resource(self, resource: str) -> None:
+        """Tombstone all vectors of a resource."""
+        with self._lock:
+            code = self._code(f"resource:{resource}")
+            if code is None or self.size == 0:
+                return
+
+            self._rows[self._rows[:, _RESOURCE] == code, _RESOURCE] = _DELETED
+            self._rows.flush()
+
+    def delete(self, resource: str, ids: Sequence[bytes]) -> None:
+        """Tombstone vectors of a resource by their IDs."""
+        with self._lock:
+            code = self._code(f"resource:{resource}")
+            if code is None or self.size == 0:
+                return
+
+            targets = set(ids)
+            rows = np.flatnonzero(self._rows[:, _RESOURCE] == code)
+            deleted = [i for i in rows if self._ids[i].tobytes() in targets]
+            if deleted:
+                self._rows[deleted, _RESOURCE] = _DELETED
+                self._rows.flush()
+
+    def _train(self, sample_size: int = 256) -> None:
+        # Spherical k-means on a sample of the live vectors
+        live = np.flatnonzero(self._rows[:, _RESOURCE] != _DELETED)
+        if len(live) < self.lists:
+            return
+
+        rng = np.random.default_rng(0)
+        sample_rows = rng.choice(live, min(len(live), self.lists * sample_size), replace=False)
+        sample = self._vectors[np.sort(sample_rows)]
+
+        self._centroids = spherical_kmeans(sample, self.lists)
+        np.save(self._path("centroids.npy"), self._centroids)
+
+        for start in range(0, self.size, 65536):
+            end = min(start + 65536, self.size)
+            self._rows[start:end, _LIST] = self._assign(np.asarray(self._vectors[start:end]))
+        self._rows.flush()
+
+        self._state["trained_rows"] = self.size
+        self._save_state()
+
+    def search(
+        self,
+        query: np.ndarray,
+        user: str,
+        resources: Optional[Sequence[str]],
+        limit: int,
+    ) -> tuple[list[bytes], np.ndarray]:
+        """
+        Find the vectors of a user most similar to the query.
+
+        :param query: The query vector.
+        :param user: The user whose vectors are searched.
+        :param resources: Resources to restrict the search to. (Optional)
+        :param limit: Maximum number of results.
+        :return: The IDs of the results and their cosine similarities, most similar first.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            user_code = self._code(f"user:{user}")
+            if user_code is None or self.size == 0:
+                return [], np.empty(0, dtype=np.float32)
+
+            rows = np.asarray(self._rows)
+            mask = rows[:, _USER] == user_code
+            if resources:
+                codes = [self._code(f"resource:{r}") for r in resources]
+                mask &= np.isin(rows[:, _RESOURCE], [c for c in codes if c is not None])
+            else:
+                mask &= rows[:, _RESOURCE] != _DELETED
+
+            # Probing only pays off if it scans fewer vectors than the owner has
+            if self._centroids is not None and mask.sum() > self.size * self.probes / self.lists:
+                probes = min(self.probes, self.lists)
+                probed = np.argpartition(-(self._centroids @ query), probes - 1)[:probes]
+                mask &= np.isin(rows[:, _LIST], probed)
+
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return [], np.empty(0, dtype=np.float32)
+
+            scores = self._vectors[candidates] @ query
+            best = np.argpartition(-scores, min(limit, len(scores)) - 1)[:limit]
+            best = best[np.argsort(-scores[best], kind="stable")]
+
+            return [self._ids[i].tobytes() for i in candidates[best]], scores[best]
@@ -0,0 +1,111 @@
+from typing import List, Optional, Sequence
+
+from beanie import PydanticObjectId
+from pymongo.operations import SearchIndexModel
+
+from src.config import CONFIG
+from src.resources.models import Chunk
+
+
+def lexical_index_definition() -> dict:
+    """Build the Atlas Search index definition over the chunk contents.
+
+    Returns:
+        dict: The search index definition.
+    """
+    return {
+        "mappings": {
+            "dynamic": False,
+            "fields": {
+                "content": {"type": "string", "analyzer": CONFIG.mongo.lexical_index_analyzer},
+                "user": {"type": "objectId"},
+                "resource": {"type": "objectId"},
+            },
+        }
+    }
+
+
+async def create_lexical_index() -> None:
+    """Create the Atlas Search index over the chunk contents, or update it to the configuration.
+
+    Atlas keeps the index in sync with the chunk collection, so ingestion and
+    deletion need no extra work. The chunk collection must exist, which the
+    vector store index creation ensures.
+    """
+    collection = Chunk.get_pymongo_collection()
+    indexes = await collection.list_search_indexes(CONFIG.mongo.lexical_index_name).to_list()
+    definition = lexical_index_definition()
+
+    if indexes:
+        if indexes[0].get("latestDefinition", {}).get("mappings") != definition["mappings"]:
+            await collection.update_search_index(CONFIG.mongo.lexical_index_name, definition)
+        return
+
+    await collection.create_search_index(
+        SearchIndexModel(definition=definition, name=CONFIG.mongo.lexical_index_name, type="search")
+    )
+
+
+async def lexical_search(
+    query: str,
+    user_id: PydanticObjectId,
+    resource_ids: Optional[List[PydanticObjectId]],
+    limit: int,
+    projection: dict,
+) -> list[dict]:
+    """Find the chunks best matching the terms of a query.
+
+    Args:
+        query (str): The query string.
+        user_id (PydanticObjectId): The user whose chunks are searched.
+        resource_ids (list[PydanticObjectId]): Resources to search within. (Optional)
+        limit (int): Maximum number of results.
+        projection (dict): Fields of the chunk documents to return.
+
+    Returns:
+        list[dict]: The projected chunks, best match first.
+    """
+    filters = [{"equals": {"path": "user", "value": user_id}}]
+    if resource_ids:
+        filters.append({"in": {"path": "resource", "value": resource_ids}})
+
+    pipeline = [
+        {
+            "$search": {
+                "index": CONFIG.mongo.lexical_index_name,
+                "compound": {
+                    "must": [{"text": {"query": query, "path": "content"}}],
+                    "filter": filters,
+                },
+            }
+        },
+        {"$limit": limit},
+        {"$project": projection},
+    ]
+
+    collection = Chunk.get_pymongo_collection()
+    return await collection.aggregate(pipeline).to_list()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[dict]], k: int) -> list[dict]:
+    """Merge rankings of chunk documents by their reciprocal ranks.
+
+    Every document scores `1 / (k + rank)` per ranking it appears in, so
+    documents ranked well by several searches come first.
+
+    Args:
+        rankings (Sequence[Sequence[dict]]): Rankings of documents with an `_id`, best first.
+        k (int): Rank offset damping the weight of the top ranks.
+
+    Returns:
+        list[dict]: The distinct documents, best fused score first.
+    """
+    scores: dict = {}
+    documents: dict = {}
+
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            scores[document["_id"]] = scores.get(document["_id"], 0.0) + 1.0 / (k + rank)
+            documents.setdefault(document["_id"], document)
+
+    return [documents[i] for i in sorted(scores, key=scores.get, reverse=True)]
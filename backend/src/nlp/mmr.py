@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Optional, Sequence
 
+import numpy as np
 
 
 class MMRSelector:
@@ -19,42 +20,63 @@ class MMRSelector:
         self.similarity_threshold = similarity_threshold
 
     @staticmethod
-    def _dot(u: List[float], v: List[float]) -> float:
-        return sum(a * b for a, b in zip(u, v))
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        # Zero vectors keep a norm of 1 and thus a cosine similarity of 0
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
 
-    @classmethod
-    def _norm(cls, u: List[float]) -> float:
-        return (cls._dot(u, u) or 1.0) ** 0.5
-
-    @classmethod
-    def _cosine(cls, u: List[float], v: List[float]) -> float:
-        return cls._dot(u, v) / (cls._norm(u) * cls._norm(v))
-
-    def select(self, query_vec: List[float], doc_vecs: List[List[float]]) -> List[int]:
+    def select(
+        self,
+        query_vec: Sequence[float],
+        doc_vecs: Sequence[Sequence[float]],
+        relevance: Optional[np.ndarray] = None,
+        exempt: Optional[np.ndarray] = None,
+    ) -> List[int]:
         """
         Perform Maximal Marginal Relevance (MMR) selection.
 
+        Vectors are normalised once, and the maximum similarity of every
+        candidate to the selected documents is updated with a single
+        matrix-vector product per pick.
+
         :param query_vec: Vector representing the query.
-        :param doc_vecs: List of document vectors.
+        :param doc_vecs: List or matrix of document vectors.
+        :param relevance: Precomputed cosine similarities of the documents to
+                          the query, e.g. search scores. Computed if omitted.
+        :param exempt: Mask of documents selectable regardless of the
+                       similarity threshold, e.g. lexical matches. (Optional)
         :return: Indices of selected documents.
         """
+        if len(doc_vecs) == 0:
+            return []
+
+        docs = self._normalize(np.asarray(doc_vecs, dtype=np.float32))
+
+        if relevance is None:
+            relevance = docs @ self._normalize(np.asarray(query_vec, dtype=np.float32))
+        relevance = np.asarray(relevance, dtype=np.float32)
+
+        weighted_relevance = self.lambda_param * relevance
+        max_similarity = np.full(len(docs), -np.inf, dtype=np.float32)
         selected: List[int] = []
-        candidates = list(range(len(doc_vecs)))
-        relevance = [self._cosine(query_vec, d) for d in doc_vecs]
 
-        while candidates and len(selected) < self.final_k:
+        # Enforce similarity threshold. Documents below it are never selected
+        # and do not affect the diversity of the others.
+        candidates = relevance >= self.similarity_threshold
+        if exempt is not None:
+            candidates |= np.asarray(exempt, dtype=bool)
+
+        while candidates.any() and len(selected) < self.final_k:
             if not selected:
-                best = max(candidates, key=lambda i: relevance[i])
+                scores = relevance.copy()
             else:
-                best = max(
-                    candidates,
-                    key=lambda i: self.lambda_param * relevance[i]
-                    - (1.0 - self.lambda_param)
-                    * max(self._cosine(doc_vecs[i], doc_vecs[j]) for j in selected),
-                )
-            # Enforce similarity threshold
-            if relevance[best] >= self.similarity_threshold:
-                selected.append(best)
-            candidates.remove(best)
+                scores = weighted_relevance - (1.0 - self.lambda_param) * max_similarity
+            scores[~candidates] = -np.inf
+
+            best = int(np.argmax(scores))
+            candidates[best] = False
+            selected.append(best)
+            np.maximum(max_similarity, docs @ docs[best], out=max_similarity)
 
         return selected
@@ -0,0 +1,339 @@
+import asyncio
+import base64
+import io
+import json
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, NamedTuple
+
+import pandas as pd
+from langchain_text_splitters import TokenTextSplitter
+from langchain_unstructured import UnstructuredLoader
+from pypdf import PdfReader, PdfWriter
+
+from src.config import CONFIG
+from src.nlp.textcleaner import TextCleaner
+
+
+__logger = logging.getLogger(__name__)
+
+__TEXT_CLEANER = TextCleaner(
+    take=CONFIG.embedding_client.textcleaner_take,
+    min_ratio=CONFIG.embedding_client.textcleaner_ratio
+)
+
+__PDF_SPLITTER = TokenTextSplitter(
+    chunk_size=CONFIG.embedding_client.chunk_size,
+    chunk_overlap=CONFIG.embedding_client.chunk_overlap,
+    encoding_name="cl100k_base",
+)
+
+# Options that determine the produced chunks, see `ingestion_fingerprint`
+PARSER_OPTIONS = dict(
+    infer_table_structure=True,   # Critical for keeping tables together
+    languages=["deu", "eng"],
+    skip_infer_table_types=["Header", "Footer"],
+
+    # --- THE FIX: NATIVE CHUNKING ---
+    chunking_strategy="by_title",   # Groups elements logically under headings
+    max_characters=2000,            # Target size for each chunk
+    combine_text_under_n_chars=500, # Merges small snippets into the next chunk
+    multipage_sections=True,        # Allows chunks to span across pages if logical
+)
+
+
+def html_to_markdown(html_str: str) -> str:
+    """Converts one or multiple HTML table strings to clean Markdown."""
+    try:
+        # pd.read_html returns a list of DataFrames for all <table> tags found
+        dfs = pd.read_html(io.StringIO(html_str))
+        if not dfs:
+            return ""
+
+        # Join multiple tables with double newlines
+        return "\n\n".join([df.to_markdown(index=False) for df in dfs])
+    except Exception:
+        # If conversion fails, return the raw text to avoid losing data
+        return html_str
+
+
+def _reconstruct_orig_elements(orig_elements_raw: str) -> str:
+    # DECOMPRESS: Unstructured uses Gzip + Base64 for serialization
+    decoded_bytes = base64.b64decode(orig_elements_raw)
+    decompressed_bytes = zlib.decompress(decoded_bytes)
+    elements_list = json.loads(decompressed_bytes)
+
+    reconstructed_parts = []
+    for el in elements_list:
+        category = el.get("type")
+        el_metadata = el.get("metadata", {})
+
+        if category == "Table" and "text_as_html" in el_metadata:
+            # Convert table to markdown
+            reconstructed_parts.append(html_to_markdown(el_metadata["text_as_html"]))
+        else:
+            text = el.get("text", "")
+            if text.strip():
+                reconstructed_parts.append(text)
+
+    return "\n".join(reconstructed_parts)
+
+
+def _clean_chunk(page_content: str, metadata: dict) -> str:
+    # 1. Check for compressed 'orig_elements'
+    orig_elements_raw = metadata.get("orig_elements")
+
+    if isinstance(orig_elements_raw, str) and len(orig_elements_raw) > 0:
+        try:
+            reconstructed_text = _reconstruct_orig_elements(orig_elements_raw)
+            return __TEXT_CLEANER.clean_chunk_text(reconstructed_text)
+        except Exception as e:
+            # If decompression fails, we fall through to standard cleaning
+            __logger.warning(f"Decompression failed: {e}")
+
+    # 2. Fallback: Top-level Table check
+    if metadata.get("category") == "Table" and "text_as_html" in metadata:
+        markdown = html_to_markdown(metadata["text_as_html"])
+        return __TEXT_CLEANER.clean_chunk_text(markdown, table=True)
+
+    # 3. Fallback: Standard text cleaning
+    return __TEXT_CLEANER.clean_chunk_text(page_content)
+
+
+def count_pages(file_path: str) -> int:
+    """Count the pages of a PDF file.
+
+    Args:
+        file_path (str): Path to the PDF file.
+
+    Returns:
+        int: The number of pages.
+
+    Raises:
+        ValueError: If the PDF file could not be read.
+    """
+    try:
+        return len(PdfReader(file_path).pages)
+    except Exception as e:
+        raise ValueError(f"Failed to read PDF: {str(e)}")
+
+
+class ParsedWindow(NamedTuple):
+    first_page: int
+    last_page: int
+    chunks: list
+    text_layer_pages: int
+    layout_pages: int
+
+
+def _has_text_layer(text: str) -> bool:
+    characters = "".join(text.split())
+    if len(characters) < CONFIG.ingestion.text_layer_min_chars:
+        return False
+
+    # Broken text layers mostly consist of symbols and replacement characters
+    alnum = sum(1 for c in characters if c.isalnum())
+    return alnum / len(characters) >= CONFIG.ingestion.text_layer_min_alnum_ratio
+
+
+def _split_text_pages(pages: list[tuple[int, str]]) -> list[dict]:
+    cleaned_texts = __TEXT_CLEANER.clean_pages([text for _, text in pages])
+
+    return [
+        {"page_content": chunk, "metadata": {"page": page, "category": "text"}}
+        for (page, _), text in zip(pages, cleaned_texts)
+        for chunk in __PDF_SPLITTER.split_text(text)
+    ]
+
+
+def partition_layout_page(file_path: str, page: int) -> list[dict]:
+    """Partition a single page without a usable text layer with unstructured.
+
+    Runs synchronously and is meant to be executed in the parser pool, so
+    the layout pages of a window are partitioned in parallel.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        page (int): The page to partition (1-based).
+
+    Returns:
+        list[dict]: Chunks with `page_content` and `metadata` (`page`, `category`).
+
+    Raises:
+        ValueError: If the page could not be parsed.
+    """
+    try:
+        writer = PdfWriter()
+        writer.add_page(PdfReader(file_path).pages[page - 1])
+
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        buffer.seek(0)
+    except Exception as e:
+        raise ValueError(f"Failed to read PDF: {str(e)}")
+
+    loader = UnstructuredLoader(
+        file=buffer,
+        metadata_filename=file_path,
+        partition_via_api=False,
+        strategy=CONFIG.ingestion.layout_strategy,
+        **PARSER_OPTIONS,
+    )
+
+    try:
+        documents = loader.load()
+    except Exception as e:
+        # Catch errors if local dependencies (tesseract/poppler) are missing
+        raise ValueError(f"Failed to process PDF with Unstructured: {str(e)}")
+
+    return [
+        {
+            "page_content": _clean_chunk(document.page_content, document.metadata),
+            "metadata": {"page": page, "category": document.metadata.get("category", "text")},
+        }
+        for document in documents
+    ]
+
+
+def route_pdf_window(
+    file_path: str, first_page: int, last_page: int
+) -> tuple[ParsedWindow, list[int]]:
+    """Extract the pages of a window with a usable text layer and collect the others.
+
+    Pages with a usable text layer are extracted directly with pypdf and
+    split by tokens. The remaining pages (scans, broken text layers) are
+    returned for `partition_layout_page`.
+
+    Runs synchronously and is meant to be executed in the parser pool.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        first_page (int): First page of the window (1-based, inclusive).
+        last_page (int): Last page of the window (1-based, inclusive).
+
+    Returns:
+        tuple[ParsedWindow, list[int]]: The window with the chunks of the text
+            layer pages, and the pages that need layout parsing.
+
+    Raises:
+        ValueError: If the PDF file could not be read.
+    """
+    try:
+        reader = PdfReader(file_path)
+        page_texts = [
+            (page, reader.pages[page - 1].extract_text() or "")
+            for page in range(first_page, last_page + 1)
+        ]
+    except Exception as e:
+        raise ValueError(f"Failed to read PDF: {str(e)}")
+
+    text_pages = []
+    layout_pages = []
+    for page, text in page_texts:
+        if _has_text_layer(text):
+            text_pages.append((page, text))
+        else:
+            layout_pages.append(page)
+
+    window = ParsedWindow(
+        first_page=first_page,
+        last_page=last_page,
+        chunks=_split_text_pages(text_pages) if text_pages else [],
+        text_layer_pages=len(text_pages),
+        layout_pages=len(layout_pages),
+    )
+    return window, layout_pages
+
+
+def _warm_up() -> None:
+    # Importing the partitioners up front keeps the first parse fast
+    import unstructured.partition.pdf  # noqa: F401
+
+    __PDF_SPLITTER.split_text("warm up")
+
+
+class ParserPool:
+    def __init__(self, workers: int):
+        """
+        Long-lived pool of warm worker processes for CPU-bound PDF parsing.
+
+        :param workers: Number of worker processes.
+        """
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+
+    async def start(self) -> None:
+        """Spawn the worker processes and wait until all of them are warm."""
+        self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers))
+        )
+
+    def stop(self) -> None:
+        """Shut the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a picklable function in a worker process.
+
+        A pool broken by a crashed worker, e.g. killed for running out of
+        memory, is replaced before the error is passed on.
+        """
+        if self._executor is None:
+            self._executor = self._create_executor()
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except BrokenProcessPool:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            raise
+
+
+PARSER_POOL = ParserPool(workers=CONFIG.ingestion.parse_workers)
+"""Global PDF parser pool, started with the application."""
+
+
+async def parse_pdf_window(file_path: str, first_page: int, last_page: int) -> ParsedWindow:
+    """Parse and clean a window of pages of a PDF file into plain chunk dictionaries.
+
+    Every page is routed on its own: pages with a usable text layer are
+    extracted directly, the remaining pages are partitioned by unstructured
+    with the configured layout/OCR strategy, one page per task in parallel
+    across the parser pool. Chunks never span across windows.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        first_page (int): First page of the window (1-based, inclusive).
+        last_page (int): Last page of the window (1-based, inclusive).
+
+    Returns:
+        ParsedWindow: Chunks with `page_content` and `metadata` (`page`, `category`),
+            and the number of pages that took each path.
+
+    Raises:
+        ValueError: If the pages could not be parsed.
+    """
+    window, layout_pages = await PARSER_POOL.run(route_pdf_window, file_path, first_page, last_page)
+
+    partitioned = await asyncio.gather(
+        *(PARSER_POOL.run(partition_layout_page, file_path, page) for page in layout_pages)
+    )
+    chunks = window.chunks + [chunk for page_chunks in partitioned for chunk in page_chunks]
+    chunks.sort(key=lambda chunk: chunk["metadata"]["page"])
+
+    return window._replace(chunks=chunks)
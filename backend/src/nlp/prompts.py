@@ -0,0 +1,121 @@
+from typing import Callable
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import (
+    ChatPromptTemplate,
+    MessagesPlaceholder,
+    HumanMessagePromptTemplate,
+    SystemMessagePromptTemplate,
+)
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+
+PROMPT_MESSAGES = {
+    "en": {
+        "system":  """\
+            You are a helpful assistant that can answer questions based on the provided resources.
+            A list of resources will be provided before every message, each containing a unique resource ID and its content.
+
+            You decide whether one of the resources is appropriate to answer the user's questions accurately and concisely.
+            IMPORTANT:
+            If a sentence or paragraph refers to a resource, cite the resource ID in **square brackets** at the end.
+            Example: "The capital of France is Paris [507f1f77bcf86cd799439011]."
+            If you use information from multiple resources, cite each resource ID in **separate** square brackets.
+            Example: "The capital of France is Paris [507f1f77bcf86cd799439011] [507f1f77bcf86cd799439012]."
+
+            If none matches the query, you can try to answer without resources, but then you MUST include a hint that you did not use resources.
+            In either case, DO NOT make up information - if you are not sure, refuse the answer and apologize kindly.\
+            """,
+        "human": """\
+            Here are the current resources you may use to answer my question:
+            {resources}
+
+            {query}\
+            """,
+
+        "plain_system": """\
+            You are a helpful, concise assistant. Answer conversationally.
+            Do not cite documents or fabricate document-based claims in this mode.\
+            """,
+        "plain_human": """\
+            {query}\
+            """,
+    },
+
+    "de": {
+        "system": """\
+            Sie sind ein hilfreicher Assistent, der Fragen anhand der bereitgestellten Ressourcen beantworten kann.
+            Vor jeder Nachricht wird eine Liste mit Ressourcen bereitgestellt, die jeweils eine eindeutige Ressourcen-ID und deren Inhalt enthält.
+
+            Sie entscheiden, ob eine der Ressourcen geeignet ist, um die Fragen des Benutzers präzise und prägnant zu beantworten.
+            WICHTIG:
+            Wenn sich ein Satz oder Absatz auf eine Ressource bezieht, geben Sie die Ressourcen-ID am Ende in **eckigen Klammern** an.
+            Beispiel: „Die Hauptstadt von Frankreich ist Paris [507f1f77bcf86cd799439011].“
+            Wenn Sie Informationen aus mehreren Ressourcen verwenden, geben Sie jede Ressourcen-ID in **separaten** eckigen Klammern an.
+            Beispiel: „Die Hauptstadt von Frankreich ist Paris [507f1f77bcf86cd799439011] [507f1f77bcf86cd799439012].“
+
+            Wenn keine der Quellen mit der Suchanfrage übereinstimmt, können Sie versuchen, die Frage ohne Quellenangaben zu beantworten, müssen dann aber unbedingt einen Hinweis darauf geben, dass Sie keine Quellen verwendet haben.
+            Erfinden Sie in keinem Fall Informationen – wenn Sie sich nicht sicher sind, lehnen Sie die Beantwortung der Frage ab und entschuldigen Sie sich höflich.\
+            """,
+        "human": """\
+            Hier sind die aktuellen Ressourcen, die Sie zur Beantwortung meiner Frage verwenden können:
+            {resources}
+
+            {query}\
+            """,
+        "plain_system": """\
+            Sie sind ein hilfsbereiter, prägnanter Assistent. Antworten Sie in einem dialogorientierten Stil.
+            Zitieren Sie in diesem Modus keine Dokumente und erfinden Sie keine dokumentbasierten Behauptungen.\
+            """,
+        "plain_human": """\
+            {query}\
+            """,
+    },
+}
+"""System and human prompt templates per language, with and without retrieved resources."""
+
+
+def build_prompt_chain(
+    chat_model: BaseChatModel,
+    get_session_history: Callable[[str], BaseChatMessageHistory],
+    language: str = "en",
+    needs_retrieval: bool = True,
+) -> RunnableWithMessageHistory:
+    """Build the chat chain of a language, keeping the message history per session.
+
+    Args:
+        chat_model (BaseChatModel): The chat model answering the prompt.
+        get_session_history (Callable[[str], BaseChatMessageHistory]): History lookup by session ID.
+        language (str): Language of the prompt templates.
+        needs_retrieval (bool): Whether the prompt contains retrieved resources.
+
+    Returns:
+        RunnableWithMessageHistory: The chain streaming the answer as strings.
+    """
+    msgs = PROMPT_MESSAGES[language]
+
+    if needs_retrieval:
+        system_msg = SystemMessagePromptTemplate.from_template(msgs["system"])
+        human_msg = HumanMessagePromptTemplate.from_template(msgs["human"])
+    else:
+        system_msg = SystemMessagePromptTemplate.from_template(msgs["plain_system"])
+        human_msg = HumanMessagePromptTemplate.from_template(msgs["plain_human"])
+
+    prompt_template = ChatPromptTemplate(
+        [
+            system_msg,
+            MessagesPlaceholder(variable_name="history"),
+            human_msg,
+        ]
+    )
+
+    chain = prompt_template | chat_model | StrOutputParser()
+
+    return RunnableWithMessageHistory(
+        chain,
+        get_session_history,
+        input_messages_key="query",
+        history_messages_key="history",
+    )
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.config import CONFIG
+from src.metrics.models import BatchStats
+from src.nlp.clients import EMBEDDING_CLIENT
+
+
+class QueryBatcher:
+    def __init__(self, client: Embeddings, max_wait: float, max_batch_size: int):
+        """
+        Embed concurrent queries of different requests as one batch.
+
+        A query waits at most `max_wait` seconds for others to join its batch,
+        a full batch is sent right away. Every caller receives its own
+        embedding, or the error of the whole batch.
+
+        :param client: Embedding client used for every batch.
+        :param max_wait: Maximum time in seconds a query waits for a batch to fill.
+        :param max_batch_size: Maximum number of queries sent in one request.
+        """
+        self.client = client
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self.stats = BatchStats()
+        self._pending: list[tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single query together with concurrent ones.
+
+        :param text: The query to embed.
+        :return: The embedding of the query.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            # Keep a reference, so the task is not garbage collected while running
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        self.stats.record(len(batch), [(started - enqueued) * 1000 for _, _, enqueued in batch])
+
+        # Queries of cancelled requests are not embedded
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        try:
+            embeddings = await self.client.aembed_documents([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+QUERY_BATCHER = QueryBatcher(
+    client=EMBEDDING_CLIENT,
+    max_wait=CONFIG.embedding_client.query_batch_wait_ms / 1000,
+    max_batch_size=CONFIG.embedding_client.query_batch_max_size,
+)
+"""Global batcher of the query embeddings of concurrent searches."""
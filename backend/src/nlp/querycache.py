@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+from src.config import CONFIG
+from src.metrics.models import CacheStats
+
+
+# Approximate per-entry overhead of the key, the tuple and the array header
+_ENTRY_OVERHEAD = 256
+
+
+def normalize_query(query: str) -> str:
+    """Collapse the whitespace of a query for use as cache key.
+
+    The case is kept, as the embedding model distinguishes it.
+    """
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, model_name: str, max_bytes: int, ttl: float):
+        """
+        In-process LRU cache of query embeddings, bounded by memory and entry age.
+
+        Queries are keyed by the embedding model and the formatted query with
+        collapsed whitespace. The least recently used entries are
+        evicted once the cached vectors exceed `max_bytes`.
+
+        :param model_name: Name of the embedding model the vectors belong to.
+        :param max_bytes: Maximum memory of the cached entries.
+        :param ttl: Maximum age of an entry in seconds.
+        """
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.size_bytes = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[np.ndarray, float]] = OrderedDict()
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a formatted query.
+
+        :param query: The formatted query.
+        :return: The cached embedding, or None if missing or expired.
+        """
+        key = (self.model_name, normalize_query(query))
+        entry = self._entries.get(key)
+
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def put(self, query: str, embedding: List[float]) -> np.ndarray:
+        """
+        Cache the embedding of a formatted query, evicting the least recently used entries.
+
+        :param query: The formatted query.
+        :param embedding: Its embedding.
+        :return: The cached, read-only embedding.
+        """
+        key = (self.model_name, normalize_query(query))
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector.flags.writeable = False
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (vector, time.monotonic() + self.ttl)
+        self.size_bytes += vector.nbytes + _ENTRY_OVERHEAD
+
+        while self.size_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+        return vector
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        vector, _ = self._entries.pop(key)
+        self.size_bytes -= vector.nbytes + _ENTRY_OVERHEAD
+
+    async def embed(self, query: str, embed: Callable[[str], Awaitable[List[float]]]) -> np.ndarray:
+        """
+        Embed a formatted query, only calling the embedding function on a miss.
+
+        :param query: The formatted query.
+        :param embed: Embedding function for a single query.
+        :return: The embedding of the query.
+        """
+        cached = self.get(query)
+        if cached is not None:
+            return cached
+
+        return self.put(query, await embed(query))
+
+
+QUERY_CACHE = QueryEmbeddingCache(
+    model_name=CONFIG.embedding_client.model_name,
+    max_bytes=CONFIG.embedding_client.query_cache_max_mb * 1024 * 1024,
+    ttl=CONFIG.embedding_client.query_cache_ttl_seconds,
+)
+"""Global in-process cache of query embeddings."""
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from beanie import PydanticObjectId
+
+from src.config import CONFIG
+from src.nlp.vectors import from_bson_vector, stack_summaries
+from src.resources.models import Resource
+
+
+class UserSummaries(NamedTuple):
+    unsummarized: List[PydanticObjectId]
+    summarized: List[PydanticObjectId]
+    vectors: Optional[np.ndarray]
+    owners: Optional[np.ndarray]
+
+
+class ResourceSummaries:
+    def __init__(self, max_users: int):
+        """
+        Cached summary vectors of the resources of each user.
+
+        The summary vectors of all resources of a user are stacked into one
+        matrix and cached per user library version, which writing summaries
+        and every other change to the resources bumps. Only the latest
+        version of the `max_users` most recently searching users is kept.
+
+        :param max_users: Maximum number of users with cached summaries.
+        """
+        self.max_users = max_users
+        self._by_user: OrderedDict[PydanticObjectId, tuple[int, UserSummaries]] = OrderedDict()
+
+    async def get(self, user_id: PydanticObjectId, library_version: int) -> UserSummaries:
+        """
+        Get the stacked summary vectors of a user's resources.
+
+        :param user_id: The ID of the user.
+        :param library_version: The version of the user's library read by the search.
+        :return: The resources without summary vectors, e.g. still being
+            ingested, the summarized resources, their stacked summary vectors
+            and the index of the resource owning each vector.
+        """
+        cached = self._by_user.get(user_id)
+        if cached is not None and cached[0] == library_version:
+            self._by_user.move_to_end(user_id)
+            return cached[1]
+
+        resources = await Resource.get_pymongo_collection().find(
+            {"user": user_id}, {"summary_embeddings": 1}
+        ).to_list()
+        summarized = [r for r in resources if r.get("summary_embeddings")]
+
+        vectors, owners = None, None
+        if summarized:
+            vectors, owners = stack_summaries([
+                np.stack([from_bson_vector(v) for v in r["summary_embeddings"]])
+                for r in summarized
+            ])
+
+        summaries = UserSummaries(
+            unsummarized=[r["_id"] for r in resources if not r.get("summary_embeddings")],
+            summarized=[r["_id"] for r in summarized],
+            vectors=vectors,
+            owners=owners,
+        )
+        self._by_user[user_id] = (library_version, summaries)
+        self._by_user.move_to_end(user_id)
+
+        while len(self._by_user) > self.max_users:
+            self._by_user.popitem(last=False)
+
+        return summaries
+
+
+RESOURCE_SUMMARIES = ResourceSummaries(max_users=CONFIG.mongo.search_cache_max_users)
+"""Global cache of resource summary vectors for preselecting resources."""
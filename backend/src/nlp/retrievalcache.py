@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+from beanie import PydanticObjectId
+
+from src.config import CONFIG
+from src.metrics.models import CacheStats
+from src.nlp.querycache import normalize_query
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int):
+        """
+        In-process LRU cache of the chunks selected by similarity searches.
+
+        Results are keyed by the user, the version of the user's library, the
+        searched resources and the normalised query. Every change to the
+        library bumps its version, so results of an outdated library are never
+        looked up again and age out of the cache.
+
+        :param max_entries: Maximum number of cached results.
+        """
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, list[tuple[PydanticObjectId, float]]] = OrderedDict()
+
+    @staticmethod
+    def key(
+        user_id: PydanticObjectId,
+        library_version: int,
+        resource_ids: Optional[List[PydanticObjectId]],
+        query: str,
+    ) -> Hashable:
+        resources = tuple(sorted(str(r) for r in resource_ids)) if resource_ids else None
+        return (str(user_id), library_version, resources, normalize_query(query))
+
+    def get(self, key: Hashable) -> Optional[list[tuple[PydanticObjectId, float]]]:
+        """
+        Look up a search result.
+
+        :param key: The key of the search.
+        :return: The IDs and scores of the selected chunks, or None on a miss.
+        """
+        result = self._entries.get(key)
+        if result is None:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return result
+
+    def put(self, key: Hashable, result: list[tuple[PydanticObjectId, float]]) -> None:
+        """
+        Cache a search result, evicting the least recently used one if full.
+
+        :param key: The key of the search.
+        :param result: The IDs and scores of the selected chunks.
+        """
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+RETRIEVAL_CACHE = RetrievalCache(max_entries=CONFIG.mongo.search_cache_max_entries)
+"""Global cache of similarity search results."""
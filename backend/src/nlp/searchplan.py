@@ -0,0 +1,126 @@
+import math
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from beanie import PydanticObjectId
+
+from src.config import CONFIG
+from src.resources.models import Chunk, Resource
+
+
+class SearchPlan(NamedTuple):
+    limit: int
+    num_candidates: Optional[int]
+    exact: bool
+
+
+def plan_vector_search(scope_size: int, total_size: int, limit: int) -> SearchPlan:
+    """Choose the vector search parameters for the number of chunks passing the prefilter.
+
+    Scopes of at most `search_exact_max_chunks` chunks are searched exactly.
+    Otherwise the approximate search examines `search_num_candidates_factor`
+    candidates per result, scaled up by `1 / sqrt(selectivity)` up to
+    `search_num_candidates_max_factor`, as a small filtered share of a large
+    graph needs more candidates for the same recall. The limit is kept as
+    requested, as a search never returns more results than in scope anyway.
+
+    Args:
+        scope_size (int): Number of chunks passing the prefilter.
+        total_size (int): Number of chunks in the index.
+        limit (int): Requested number of results.
+
+    Returns:
+        SearchPlan: The result limit, the number of candidates and whether to search exactly.
+    """
+    if scope_size <= CONFIG.mongo.search_exact_max_chunks:
+        return SearchPlan(limit=limit, num_candidates=scope_size, exact=True)
+
+    selectivity = scope_size / max(total_size, scope_size)
+    factor = min(
+        CONFIG.mongo.search_num_candidates_factor / math.sqrt(selectivity),
+        CONFIG.mongo.search_num_candidates_max_factor,
+    )
+    # Atlas accepts at most 10000 candidates
+    num_candidates = min(int(limit * factor), scope_size, 10000)
+
+    return SearchPlan(limit=limit, num_candidates=max(num_candidates, limit), exact=False)
+
+
+class ChunkCounts:
+    def __init__(self, max_users: int, total_ttl: float):
+        """
+        Cached numbers of chunks per resource and in total.
+
+        Per-resource counts are taken from the ingestion progress and cached
+        per user library version, which every change to the chunks bumps.
+        Resources ingested before the progress was tracked are counted by the
+        `migrate-vectors` command.
+        Only the counts of the `max_users` most recently searching users are
+        kept. The estimated total is refreshed after `total_ttl` seconds.
+
+        :param max_users: Maximum number of users with cached counts.
+        :param total_ttl: Maximum age of the total count in seconds.
+        """
+        self.max_users = max_users
+        self.total_ttl = total_ttl
+        self._by_user: OrderedDict[
+            PydanticObjectId, tuple[int, dict[PydanticObjectId, int]]
+        ] = OrderedDict()
+        self._total = 0
+        self._total_expires_at = 0.0
+
+    async def _resource_counts(
+        self, user_id: PydanticObjectId, library_version: int
+    ) -> dict[PydanticObjectId, int]:
+        cached = self._by_user.get(user_id)
+        if cached is not None and cached[0] == library_version:
+            self._by_user.move_to_end(user_id)
+            return cached[1]
+
+        resources = await Resource.get_pymongo_collection().find(
+            {"user": user_id}, {"ingestion.chunks_written": 1}
+        ).to_list()
+        counts = {r["_id"]: r.get("ingestion", {}).get("chunks_written", 0) for r in resources}
+
+        self._by_user[user_id] = (library_version, counts)
+        self._by_user.move_to_end(user_id)
+
+        while len(self._by_user) > self.max_users:
+            self._by_user.popitem(last=False)
+
+        return counts
+
+    async def scope_size(
+        self,
+        user_id: PydanticObjectId,
+        library_version: int,
+        resource_ids: Optional[List[PydanticObjectId]],
+    ) -> int:
+        """
+        Count the chunks a search prefilter selects.
+
+        :param user_id: The user whose chunks are searched.
+        :param library_version: The version of the user's library read by the search.
+        :param resource_ids: Resources to search within. (Optional)
+        :return: The number of chunks of the user, or of the given resources.
+        """
+        counts = await self._resource_counts(user_id, library_version)
+        if resource_ids:
+            return sum(counts.get(r, 0) for r in set(resource_ids))
+        return sum(counts.values())
+
+    async def total(self) -> int:
+        """
+        Estimate the number of chunks of all users.
+
+        :return: The estimated number of chunks.
+        """
+        if time.monotonic() >= self._total_expires_at:
+            self._total = await Chunk.get_pymongo_collection().estimated_document_count()
+            self._total_expires_at = time.monotonic() + self.total_ttl
+        return self._total
+
+
+CHUNK_COUNTS = ChunkCounts(max_users=CONFIG.mongo.search_cache_max_users, total_ttl=60.0)
+"""Global cache of chunk counts for planning vector searches."""
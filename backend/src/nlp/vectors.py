@@ -0,0 +1,170 @@
+from typing import Annotated, Any, Sequence, Union
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+from pydantic import PlainSerializer, PlainValidator, WithJsonSchema
+
+
+# Every BSON vector starts with its dtype and the padding of the last byte
+_FLOAT32_HEADER = BinaryVectorDtype.FLOAT32.value + b"\x00"
+VECTOR_SUBTYPE = 9
+
+
+def to_bson_vector(vector: Union[Sequence[float], np.ndarray]) -> Binary:
+    """Encode a vector as a BSON `binData` float32 vector.
+
+    Args:
+        vector (Sequence[float] | np.ndarray): The vector to encode.
+
+    Returns:
+        Binary: The vector as `binData` of the vector subtype.
+    """
+    data = np.asarray(vector, dtype="<f4").tobytes()
+    return Binary(_FLOAT32_HEADER + data, subtype=VECTOR_SUBTYPE)
+
+
+def from_bson_vector(vector: Union[Binary, Sequence[float]]) -> np.ndarray:
+    """Decode a BSON float32 vector as a read-only, zero-copy NumPy view.
+
+    Vectors still stored as arrays of doubles are converted.
+
+    Args:
+        vector (Binary | Sequence[float]): The stored vector.
+
+    Returns:
+        np.ndarray: The vector as float32 array.
+
+    Raises:
+        ValueError: If the vector is not a float32 BSON vector.
+    """
+    if not isinstance(vector, bytes):
+        return np.asarray(vector, dtype=np.float32)
+
+    if vector[:2] != _FLOAT32_HEADER:
+        raise ValueError("Not a float32 BSON vector.")
+
+    return np.frombuffer(vector, dtype="<f4", offset=2)
+
+
+def cosine_similarities(query: Sequence[float], vectors: np.ndarray) -> np.ndarray:
+    """Compute the exact cosine similarity of every row of a matrix to a query.
+
+    Args:
+        query (Sequence[float]): The query vector.
+        vectors (np.ndarray): Matrix with one vector per row.
+
+    Returns:
+        np.ndarray: One cosine similarity per row.
+    """
+    query = np.asarray(query, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+    norms[norms == 0] = 1.0
+    return (vectors @ query) / norms
+
+
+def truncate_vector(vector: Union[Sequence[float], np.ndarray], dims: int) -> np.ndarray:
+    """Truncate a Matryoshka embedding to its first dimensions and re-normalise it.
+
+    Args:
+        vector (Sequence[float] | np.ndarray): The full embedding.
+        dims (int): The number of leading dimensions to keep.
+
+    Returns:
+        np.ndarray: The truncated unit vector.
+    """
+    prefix = np.asarray(vector, dtype=np.float32)[:dims]
+    return prefix / (np.linalg.norm(prefix) or 1.0)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity.
+
+    Args:
+        vectors (np.ndarray): Matrix with one unit vector per row.
+        k (int): Number of clusters, at most the number of vectors.
+        iterations (int): Number of refinement iterations.
+        seed (int): Seed of the initial centroid choice.
+
+    Returns:
+        np.ndarray: One unit centroid per row.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), min(k, len(vectors)), replace=False)]
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty clusters keep their centroid
+        centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1.0), centroids)
+
+    return centroids.astype(np.float32)
+
+
+def stack_summaries(summaries: Sequence[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack the summary vectors of several items into one matrix.
+
+    Args:
+        summaries (Sequence[np.ndarray]): Matrix of summary vectors per item.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: All summary vectors and the index of the
+            item owning each of them.
+    """
+    vectors = np.concatenate(summaries)
+    owners = np.repeat(np.arange(len(summaries)), [len(s) for s in summaries])
+    return vectors, owners
+
+
+def rank_stacked_summaries(
+    query: Sequence[float], vectors: np.ndarray, owners: np.ndarray, items: int, top: int
+) -> np.ndarray:
+    """Rank items by the best cosine similarity of any of their stacked summary vectors to a query.
+
+    Args:
+        query (Sequence[float]): The query vector.
+        vectors (np.ndarray): The stacked summary vectors of all items.
+        owners (np.ndarray): Index of the item owning each summary vector.
+        items (int): Number of items.
+        top (int): Number of items to return.
+
+    Returns:
+        np.ndarray: Indices of the `top` best items, best first.
+    """
+    best = np.full(items, -np.inf, dtype=np.float32)
+    np.maximum.at(best, owners, cosine_similarities(query, vectors))
+
+    return np.argsort(-best, kind="stable")[:top]
+
+
+def rank_by_summaries(
+    query: Sequence[float], summaries: Sequence[np.ndarray], top: int
+) -> np.ndarray:
+    """Rank items by the best cosine similarity of any of their summary vectors to a query.
+
+    Args:
+        query (Sequence[float]): The query vector.
+        summaries (Sequence[np.ndarray]): Matrix of summary vectors per item.
+        top (int): Number of items to return.
+
+    Returns:
+        np.ndarray: Indices of the `top` best items, best first.
+    """
+    vectors, owners = stack_summaries(summaries)
+    return rank_stacked_summaries(query, vectors, owners, len(summaries), top)
+
+
+def _validate_bson_vector(value: Any) -> Binary:
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        return value
+    return to_bson_vector(from_bson_vector(value))
+
+
+BsonVector = Annotated[
+    Binary,
+    PlainValidator(_validate_bson_vector),
+    PlainSerializer(lambda v: from_bson_vector(v).tolist(), when_used="json"),
+    WithJsonSchema({"type": "array", "items": {"type": "number"}}),
+]
+"""Embedding field stored as BSON float32 vector, accepting lists and NumPy arrays."""
@@ -0,0 +1,337 @@
+import fcntl
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+import numpy as np
+from beanie import PydanticObjectId
+from bson import ObjectId
+from fastapi.concurrency import run_in_threadpool
+from langchain_mongodb.pipelines import vector_search_stage
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
+
+from src.config import CONFIG, VectorQuantization, VectorStoreBackend
+from src.nlp.ivfindex import IVFIndex
+from src.nlp.vectors import from_bson_vector
+from src.resources.models import Chunk
+
+
+# Held by the process using a local vector store
+_LOCK_FILE = "index.lock"
+
+
+def indexed_field() -> str:
+    """Name of the chunk field holding the vectors used for the first search stage."""
+    if CONFIG.mongo.search_index_ann_dimensions:
+        return CONFIG.mongo.search_index_ann_field
+    return CONFIG.mongo.search_index_field
+
+
+def indexed_dimensions() -> int:
+    """Number of dimensions of the vectors used for the first search stage."""
+    return CONFIG.mongo.search_index_ann_dimensions or CONFIG.mongo.search_index_dimensions
+
+
+class VectorStore(ABC):
+    """Index over the chunk vectors, searched per user and optionally per resource."""
+
+    approximate_scores: bool = False
+    """Whether search scores must be rescored with the full-precision vectors."""
+
+    @abstractmethod
+    async def create_index(self) -> None:
+        """Create or load the index, updating it to the configuration if necessary."""
+
+    @abstractmethod
+    async def search(
+        self,
+        query_vector: Sequence[float],
+        user_id: PydanticObjectId,
+        resource_ids: Optional[List[PydanticObjectId]],
+        limit: int,
+        projection: dict,
+        num_candidates: Optional[int] = None,
+        exact: bool = False,
+    ) -> tuple[list[dict], np.ndarray]:
+        """Find the chunks most similar to a query vector.
+
+        Args:
+            query_vector (Sequence[float]): The query vector for the indexed field.
+            user_id (PydanticObjectId): The user whose chunks are searched.
+            resource_ids (list[PydanticObjectId]): Resources to search within. (Optional)
+            limit (int): Maximum number of results.
+            projection (dict): Fields of the chunk documents to return.
+            num_candidates (int): Candidates examined by an approximate search,
+                a hint backends may ignore. (Optional)
+            exact (bool): Whether to search exhaustively instead of approximately,
+                a hint backends may ignore.
+
+        Returns:
+            tuple[list[dict], np.ndarray]: The projected chunks and their cosine
+                similarities to the query, most similar first.
+        """
+
+    async def add(self, chunks: list[dict]) -> None:
+        """Index inserted chunks, given as documents with `_id`, `user`, `resource` and vectors."""
+
+    async def delete_resource(self, resource_id: PydanticObjectId) -> None:
+        """Remove the chunks of a deleted resource from the index."""
+
+    async def delete_chunks(
+        self, resource_id: PydanticObjectId, chunk_ids: List[PydanticObjectId]
+    ) -> None:
+        """Remove deleted chunks of a resource from the index."""
+
+
+def score_to_cosine(scores: np.ndarray) -> np.ndarray:
+    """Convert Atlas vector search scores back to cosine similarities.
+
+    Atlas normalises `cosine` and `dotProduct` similarities to `(1 + x) / 2`
+    and `euclidean` distances to `1 / (1 + d)`. The latter is converted
+    assuming normalised embeddings.
+
+    Args:
+        scores (np.ndarray): The `vectorSearchScore` of the results.
+
+    Returns:
+        np.ndarray: The cosine similarities of the results to the query.
+    """
+    if CONFIG.mongo.search_index_similarity == "euclidean":
+        distances = 1.0 / scores - 1.0
+        return 1.0 - distances**2 / 2.0
+
+    return 2.0 * scores - 1.0
+
+
+class AtlasVectorStore(VectorStore):
+    """Atlas Vector Search over the chunk collection, kept in sync by MongoDB."""
+
+    @property
+    def approximate_scores(self) -> bool:
+        return CONFIG.mongo.search_index_quantization != VectorQuantization.NONE
+
+    @staticmethod
+    def search_index_definition() -> dict:
+        """Build the vector search index definition from the configuration.
+
+        Embeddings are stored as BSON float32 vectors, which the `vector` field
+        type indexes natively, optionally quantized to int8 or single bits. If
+        ANN dimensions are configured, the truncated embeddings are indexed
+        instead of the full ones.
+
+        Returns:
+            dict: The search index definition.
+        """
+        vector_field = {
+            "type": "vector",
+            "numDimensions": indexed_dimensions(),
+            "path": indexed_field(),
+            "similarity": CONFIG.mongo.search_index_similarity,
+        }
+
+        # Atlas quantizes the indexed vectors, the stored ones keep full precision
+        if CONFIG.mongo.search_index_quantization != VectorQuantization.NONE:
+            vector_field["quantization"] = CONFIG.mongo.search_index_quantization.value
+
+        return {
+            "fields": [
+                vector_field,
+                {
+                    "type": "filter",
+                    "path": "user",
+                },
+                {
+                    "type": "filter",
+                    "path": "resource",
+                },
+            ]
+        }
+
+    async def create_index(self) -> None:
+        """Create a search index for the Chunk collection.
+        This function checks if the search index already exists, and if not, it creates one.
+        An existing index whose definition differs from the configuration is updated.
+        If the collection does not exist, it creates a dummy document to initialize the collection first.
+
+        Raises:
+            OperationFailure: If there is an error creating the search index.
+        """
+        collection = Chunk.get_pymongo_collection()
+        indexes = await collection.list_search_indexes(CONFIG.mongo.search_index_name).to_list()
+        definition = self.search_index_definition()
+
+        if indexes:
+            if indexes[0].get("latestDefinition", {}).get("fields") != definition["fields"]:
+                await collection.update_search_index(CONFIG.mongo.search_index_name, definition)
+            return
+
+        search_index_model = SearchIndexModel(
+            definition=definition,
+            name=CONFIG.mongo.search_index_name,
+            type="vectorSearch",
+        )
+
+        try:
+            await collection.create_search_index(search_index_model)
+            return
+
+        except OperationFailure as e:
+            if e.details.get("codeName") != "NamespaceNotFound":
+                raise e
+
+        # Insert a dummy document to create the collection
+        result = await collection.insert_one({})
+        await collection.delete_one({"_id": result.inserted_id})
+
+        # Retry creating the search index
+        await collection.create_search_index(search_index_model)
+
+    async def search(
+        self, query_vector, user_id, resource_ids, limit, projection, num_candidates=None, exact=False
+    ):
+        pre_filter = {"user": user_id}
+        if resource_ids:
+            pre_filter["resource"] = {"$in": resource_ids}
+
+        search_stage = vector_search_stage(
+            [float(x) for x in query_vector],
+            indexed_field(),
+            CONFIG.mongo.search_index_name,
+            limit,
+            pre_filter,
+        )
+        if exact:
+            del search_stage["$vectorSearch"]["numCandidates"]
+            search_stage["$vectorSearch"]["exact"] = True
+        elif num_candidates:
+            search_stage["$vectorSearch"]["numCandidates"] = num_candidates
+
+        pipeline = [
+            search_stage,
+            {"$project": {**projection, "score": {"$meta": "vectorSearchScore"}}},
+        ]
+
+        collection = Chunk.get_pymongo_collection()
+        results = await collection.aggregate(pipeline).to_list()
+
+        scores = np.asarray([r.pop("score") for r in results], dtype=np.float32)
+        return results, score_to_cosine(scores)
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, directory: str, lists: int, probes: int):
+        """
+        In-process IVF index over memory-mapped files, for single-node deployments
+        without Atlas. Only chunk IDs and vectors are kept in the index, the
+        chunks themselves are read from MongoDB.
+
+        :param directory: Directory of the index files.
+        :param lists: Number of inverted lists.
+        :param probes: Number of lists scanned per search.
+        """
+        self.directory = directory
+        self.lists = lists
+        self.probes = probes
+        self._index: Optional[IVFIndex] = None
+        self._lock_file = None
+
+    def lock(self) -> None:
+        """
+        Take the exclusive lock of the index directory for the lifetime of the process.
+
+        Every process keeps its own view of the index files, so only one
+        process may use them.
+
+        :raises RuntimeError: If another process holds the lock.
+        """
+        if self._lock_file is not None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, _LOCK_FILE), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"The vector store in {self.directory} is used by another process."
+            )
+        self._lock_file = lock_file
+
+    def clear(self) -> None:
+        """Delete the index files, keeping the lock."""
+        self.lock()
+        self._index = None
+        for name in os.listdir(self.directory):
+            if name != _LOCK_FILE:
+                os.remove(os.path.join(self.directory, name))
+
+    @property
+    def index(self) -> IVFIndex:
+        if self._index is None:
+            self.lock()
+            self._index = IVFIndex(self.directory, indexed_dimensions(), self.lists, self.probes)
+        return self._index
+
+    async def create_index(self) -> None:
+        await run_in_threadpool(lambda: self.index)
+
+    async def search(
+        self, query_vector, user_id, resource_ids, limit, projection, num_candidates=None, exact=False
+    ):
+        # Owners with few vectors are already scanned exactly by the index
+        ids, scores = await run_in_threadpool(
+            self.index.search,
+            np.asarray(query_vector, dtype=np.float32),
+            str(user_id),
+            [str(r) for r in resource_ids] if resource_ids else None,
+            limit,
+        )
+        if not ids:
+            return [], scores
+
+        object_ids = [ObjectId(i) for i in ids]
+        collection = Chunk.get_pymongo_collection()
+        documents = await collection.find(
+            {"_id": {"$in": object_ids}, "user": user_id}, projection
+        ).to_list()
+        by_id = {document["_id"]: document for document in documents}
+
+        # Vectors of chunks dropped by an interrupted ingestion are skipped
+        found = [i for i, object_id in enumerate(object_ids) if object_id in by_id]
+        return [by_id[object_ids[i]] for i in found], scores[found]
+
+    async def add(self, chunks: list[dict]) -> None:
+        if not chunks:
+            return
+
+        field = indexed_field()
+        await run_in_threadpool(
+            self.index.add,
+            [chunk["_id"].binary for chunk in chunks],
+            [str(chunk["user"]) for chunk in chunks],
+            [str(chunk["resource"]) for chunk in chunks],
+            np.stack([from_bson_vector(chunk[field]) for chunk in chunks]),
+        )
+
+    async def delete_resource(self, resource_id: PydanticObjectId) -> None:
+        await run_in_threadpool(self.index.delete_resource, str(resource_id))
+
+    async def delete_chunks(
+        self, resource_id: PydanticObjectId, chunk_ids: List[PydanticObjectId]
+    ) -> None:
+        await run_in_threadpool(
+            self.index.delete, str(resource_id), [chunk_id.binary for chunk_id in chunk_ids]
+        )
+
+
+if CONFIG.vector_store.backend == VectorStoreBackend.LOCAL:
+    VECTOR_STORE: VectorStore = LocalVectorStore(
+        directory=CONFIG.vector_store.directory,
+        lists=CONFIG.vector_store.ivf_lists,
+        probes=CONFIG.vector_store.ivf_probes,
+    )
+else:
+    VECTOR_STORE: VectorStore = AtlasVectorStore()
+"""Global vector store of the configured backend."""
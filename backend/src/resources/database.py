@@ -3,59 +3,185 @@ from beanie.operators import RegEx
 from fastapi import HTTPException, UploadFile, status
 from typing import Optional, List
 
-from src.resources.storage import store_resource_file
-from src.nlp.embeddings import split_pdf, embed_chunks
-from src.resources.models import Chunk, PDFChunk, PDFResource, Resource, ResourceType
+from src.config import CONFIG
+from src.nlp.embeddings import ann_embedding, ingestion_fingerprint
+from src.nlp.vectors import from_bson_vector, to_bson_vector
+from src.nlp.vectorstore import VECTOR_STORE
+from src.resources.ingestion import INGESTION_QUEUE, update_progress
+from src.resources.storage import (
+    delete_resource_file,
+    resource_file_path,
+    store_resource_file,
+)
+from src.resources.models import (
+    Chunk,
+    IngestionJob,
+    IngestionProgress,
+    IngestionStatus,
+    PDFChunk,
+    PDFResource,
+    Resource,
+    ResourceType,
+    StoredFile,
+)
+from src.users.database import bump_library_version
+
+
+__CLONE_BATCH_SIZE = 1000
+
+
+async def find_ingested_duplicate(sha256: str, fingerprint: str) -> Optional[PDFResource]:
+    """Find an ingested PDF resource with the same file content and ingestion configuration.
 
+    Args:
+        sha256 (str): SHA-256 digest of the PDF file.
+        fingerprint (str): Fingerprint of the parser and embedding configuration.
+
+    Returns:
+        PDFResource | None: A fully ingested resource, if one exists.
+    """
+    return await PDFResource.find_one(
+        PDFResource.sha256 == sha256,
+        PDFResource.ingestion_fingerprint == fingerprint,
+        PDFResource.ingestion.status == IngestionStatus.READY,
+    )
 
-async def create_pdf_resource(file: UploadFile, user_id: PydanticObjectId):
-    """Create a new PDF resource.
+
+async def clone_chunks(
+    source_id: PydanticObjectId,
+    resource_id: PydanticObjectId,
+    user_id: PydanticObjectId,
+) -> int:
+    """Copy all chunks of a resource, including their embeddings, to another resource.
 
     Args:
-        file (UploadFile): The PDF file to be processed.
-        user_id (PydanticObjectId): The ID of the user creating the resource.
+        source_id (PydanticObjectId): The ID of the resource to copy the chunks from.
+        resource_id (PydanticObjectId): The ID of the resource receiving the chunks.
+        user_id (PydanticObjectId): The ID of the user owning the receiving resource.
 
     Returns:
-        PDFResource: The created PDF resource.
+        int: The number of cloned chunks.
     """
-    resource_id = PydanticObjectId()
+    collection = Chunk.get_pymongo_collection()
+    field = CONFIG.mongo.search_index_field
+    ann_field = CONFIG.mongo.search_index_ann_field
+    cloned = 0
+    batch = []
 
-    file_path = await store_resource_file(
-        file=file,
-        user_id=user_id,
-        resource_type=ResourceType.PDF,
-        resource_id=resource_id,
-    )
+    async for chunk in collection.find({"resource": source_id}, batch_size=__CLONE_BATCH_SIZE):
+        del chunk["_id"]
+        chunk["user"] = user_id
+        chunk["resource"] = resource_id
+
+        # Chunks ingested before the truncated embeddings were enabled lack them
+        if CONFIG.mongo.search_index_ann_dimensions and ann_field not in chunk:
+            chunk[ann_field] = to_bson_vector(ann_embedding(from_bson_vector(chunk[field])))
+
+        batch.append(chunk)
+
+        if len(batch) == __CLONE_BATCH_SIZE:
+            await collection.insert_many(batch, ordered=False)
+            await VECTOR_STORE.add(batch)
+            cloned += len(batch)
+            batch = []
+
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+        await VECTOR_STORE.add(batch)
+        cloned += len(batch)
+
+    return cloned
 
-    raw_chunks, total_pages = await split_pdf(file_path)
+
+async def create_stored_pdf_resource(
+    stored_file: StoredFile,
+    title: str,
+    user_id: PydanticObjectId,
+    resource_id: PydanticObjectId,
+) -> PDFResource:
+    """Create a PDF resource for a stored file.
+
+    If the same file was already ingested with the current configuration,
+    its chunks are cloned and the resource is ready immediately. Otherwise
+    the resource is left in the processing state for ingestion.
+
+    Args:
+        stored_file (StoredFile): The stored PDF file.
+        title (str): The title of the resource.
+        user_id (PydanticObjectId): The ID of the user creating the resource.
+        resource_id (PydanticObjectId): The ID of the resource, as used for storing the file.
+
+    Returns:
+        PDFResource: The created PDF resource.
+    """
+    fingerprint = ingestion_fingerprint()
+    duplicate = await find_ingested_duplicate(stored_file.sha256, fingerprint)
 
     pdf_resource = await PDFResource(
         id=resource_id,
-        title=file.filename,
+        title=title,
         type=ResourceType.PDF,
         user=user_id,
-        total_pages=total_pages,
+        sha256=stored_file.sha256,
+        ingestion_fingerprint=fingerprint,
+        ingestion=IngestionProgress(
+            job_id=PydanticObjectId(), status=IngestionStatus.PROCESSING
+        ),
+        total_pages=duplicate.total_pages if duplicate else 0,
+        summary_embeddings=duplicate.summary_embeddings if duplicate else [],
     ).create()
 
-    embeddings = await embed_chunks(raw_chunks)
-
-    pdf_chunks = []
-    for i, raw_chunk in enumerate(raw_chunks):
-        pdf_chunk = PDFChunk(
-            user=user_id,
-            resource=resource_id,
-            content=raw_chunk.page_content,
-            embedding=embeddings[i],
-            index=i,
-            page_number=raw_chunk.metadata.get("page", 0),
+    if duplicate:
+        cloned = await clone_chunks(duplicate.id, resource_id, user_id)
+        await update_progress(
+            pdf_resource,
+            pages_parsed=duplicate.total_pages,
+            chunks_embedded=cloned,
+            chunks_written=cloned,
+            status=IngestionStatus.READY,
         )
-        pdf_chunks.append(pdf_chunk)
-
-    await PDFChunk.insert_many(pdf_chunks)
 
+    await bump_library_version(user_id)
     return pdf_resource
 
 
+async def create_pdf_resource(file: UploadFile, user_id: PydanticObjectId) -> IngestionJob:
+    """Create a new PDF resource and queue it for ingestion.
+
+    If the same file was already ingested with the current configuration,
+    its chunks are cloned instead and the resource is ready immediately.
+
+    Args:
+        file (UploadFile): The PDF file to be processed.
+        user_id (PydanticObjectId): The ID of the user creating the resource.
+
+    Returns:
+        IngestionJob: The ingestion job and the created PDF resource.
+    """
+    resource_id = PydanticObjectId()
+
+    stored_file = await store_resource_file(
+        file=file,
+        user_id=user_id,
+        resource_type=ResourceType.PDF,
+        resource_id=resource_id,
+    )
+
+    pdf_resource = await create_stored_pdf_resource(
+        stored_file, file.filename, user_id, resource_id
+    )
+
+    if pdf_resource.ingestion.status == IngestionStatus.PROCESSING:
+        try:
+            INGESTION_QUEUE.submit(resource_id, stored_file.path)
+        except HTTPException:
+            await pdf_resource.delete()
+            delete_resource_file(user_id, ResourceType.PDF, resource_id)
+            raise
+
+    return IngestionJob(job_id=pdf_resource.ingestion.job_id, resource=pdf_resource)
+
+
 # async def get_resources(user_id: PydanticObjectId, query: str | None) -> list[Resource]:
 async def get_resources(user_id: PydanticObjectId, query: Optional[str]) -> List[Resource]:
     """Get all resources for the current user.
@@ -100,6 +226,58 @@ async def get_resource_by_id(
     return resource
 
 
+async def get_resource_status(
+    resource_id: PydanticObjectId, user_id: PydanticObjectId
+) -> IngestionProgress:
+    """Get the ingestion progress of a specific resource.
+
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource.
+        user_id (PydanticObjectId): The ID of the user requesting the status.
+
+    Returns:
+        IngestionProgress: The ingestion progress of the resource.
+    """
+    resource = await get_resource_by_id(resource_id, user_id)
+    return resource.ingestion
+
+
+async def retry_resource_ingestion(
+    resource_id: PydanticObjectId, user_id: PydanticObjectId
+) -> IngestionJob:
+    """Queue a failed ingestion again, resuming from its last checkpoint.
+
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource to ingest.
+        user_id (PydanticObjectId): The ID of the user requesting the retry.
+
+    Returns:
+        IngestionJob: The ingestion job and the resource in the processing state.
+
+    Raises:
+        HTTPException: If the ingestion of the resource has not failed.
+    """
+    resource = await get_resource_by_id(resource_id, user_id)
+
+    if not isinstance(resource, PDFResource) or resource.ingestion.status != IngestionStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ingestion of resource {resource_id} has not failed.",
+        )
+
+    file_path = resource_file_path(user_id, ResourceType.PDF, resource_id)
+
+    # Set before submitting, so a fast worker's final status is not overwritten
+    await update_progress(resource, status=IngestionStatus.PROCESSING)
+    try:
+        INGESTION_QUEUE.submit(resource_id, file_path)
+    except HTTPException:
+        await update_progress(resource, status=IngestionStatus.FAILED)
+        raise
+
+    return IngestionJob(job_id=resource.ingestion.job_id, resource=resource)
+
+
 async def get_chunk_by_id(
     chunk_id: PydanticObjectId, user_id: PydanticObjectId
 ) -> PDFChunk:
@@ -140,3 +318,6 @@ async def delete_resource_by_id(
     resource = await get_resource_by_id(resource_id, user_id)
     await resource.delete()
     await Chunk.find(Chunk.resource == resource_id, with_children=True).delete()
+    await VECTOR_STORE.delete_resource(resource_id)
+    await bump_library_version(user_id)
+    delete_resource_file(user_id, resource.type, resource_id)
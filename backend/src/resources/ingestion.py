@@ -0,0 +1,364 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Collection, TypeVar
+
+from beanie import PydanticObjectId
+from beanie.operators import NotIn
+from fastapi import HTTPException, status
+
+from src.config import CONFIG
+from src.nlp.embeddings import (
+    ann_embedding,
+    count_pdf_pages,
+    embed_chunks,
+    iter_pdf_windows,
+    summarize_resource,
+)
+from src.nlp.pdfparser import ParsedWindow
+from src.nlp.vectors import to_bson_vector
+from src.nlp.vectorstore import VECTOR_STORE, indexed_field
+from src.resources.models import (
+    Chunk,
+    IngestionStatus,
+    PDFChunk,
+    PDFResource,
+    ResourceType,
+)
+from src.resources.storage import delete_resource_file, resource_file_path
+from src.users.database import bump_library_version
+
+
+__logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def update_progress(resource: PDFResource, **fields) -> None:
+    """Persist ingestion progress fields of a resource.
+
+    Args:
+        resource (PDFResource): The resource being ingested.
+        **fields: Fields of `IngestionProgress` to update.
+    """
+    fields["updated_at"] = datetime.now()
+    await resource.set({f"ingestion.{key}": value for key, value in fields.items()})
+
+
+async def _buffered(source: AsyncIterator[T], maxsize: int) -> AsyncIterator[T]:
+    """Run an async generator ahead of its consumer, holding at most `maxsize` items."""
+    queue = asyncio.Queue(maxsize=maxsize)
+    end = object()
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((end, e))
+        else:
+            await queue.put((end, None))
+
+    producer = asyncio.create_task(produce())
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+async def ingest_pdf(resource: PDFResource, file_path: str) -> None:
+    """Parse, embed and store the chunks of a stored PDF file as a streaming pipeline.
+
+    Windows of pages flow through the parse, embed and insert stages, which
+    are connected by bounded queues and overlap. Peak memory scales with the
+    window size instead of the document size, and the first chunks become
+    searchable while later windows are still being parsed.
+
+    Every inserted window is checkpointed on the resource, and a repeated
+    call resumes after the last inserted window. Embedded batches of an
+    unfinished window are recovered from the embedding cache.
+
+    Args:
+        resource (PDFResource): The resource the chunks belong to.
+        file_path (str): Path to the stored PDF file.
+    """
+    total_pages = await count_pdf_pages(file_path)
+    await resource.set({PDFResource.total_pages: total_pages})
+
+    checkpoint = resource.ingestion
+
+    # Drop chunks of a window whose insertion was interrupted
+    interrupted = {"resource": resource.id, "index": {"$gte": checkpoint.next_chunk_index}}
+    interrupted_ids = await Chunk.get_pymongo_collection().distinct("_id", interrupted)
+    if interrupted_ids:
+        await Chunk.get_pymongo_collection().delete_many({"_id": {"$in": interrupted_ids}})
+        await VECTOR_STORE.delete_chunks(resource.id, interrupted_ids)
+        await bump_library_version(resource.user)
+
+    queue_size = CONFIG.ingestion.pipeline_queue_size
+    field = indexed_field()
+    chunks_embedded = checkpoint.next_chunk_index
+    chunks_written = checkpoint.next_chunk_index
+    text_layer_pages = checkpoint.pages_text_layer
+    layout_pages = checkpoint.pages_layout
+
+    async def parse_windows():
+        async for window in iter_pdf_windows(file_path, total_pages, checkpoint.next_page):
+            await update_progress(resource, pages_parsed=window.last_page)
+            yield window
+
+    async def embed_windows(windows: AsyncIterator[ParsedWindow]):
+        nonlocal chunks_embedded
+
+        async for window in windows:
+            async def on_embed_progress(embedded: int) -> None:
+                await update_progress(resource, chunks_embedded=chunks_embedded + embedded)
+
+            embeddings = await embed_chunks(window.chunks, on_progress=on_embed_progress)
+            chunks_embedded += len(window.chunks)
+            yield window, embeddings
+
+    windows = _buffered(parse_windows(), queue_size)
+
+    async for window, embeddings in _buffered(embed_windows(windows), queue_size):
+        pdf_chunks = [
+            PDFChunk(
+                id=PydanticObjectId(),
+                user=resource.user,
+                resource=resource.id,
+                content=raw_chunk.page_content,
+                embedding=embedding,
+                embedding_ann=ann_embedding(embedding),
+                index=chunks_written + i,
+                page_number=raw_chunk.metadata.get("page", 0),
+            )
+            for i, (raw_chunk, embedding) in enumerate(zip(window.chunks, embeddings))
+        ]
+
+        if pdf_chunks:
+            await PDFChunk.insert_many(pdf_chunks)
+            await VECTOR_STORE.add(
+                [
+                    {
+                        "_id": chunk.id,
+                        "user": chunk.user,
+                        "resource": chunk.resource,
+                        field: getattr(chunk, field),
+                    }
+                    for chunk in pdf_chunks
+                ]
+            )
+
+        chunks_written += len(pdf_chunks)
+        text_layer_pages += window.text_layer_pages
+        layout_pages += window.layout_pages
+
+        await update_progress(
+            resource,
+            chunks_written=chunks_written,
+            pages_text_layer=text_layer_pages,
+            pages_layout=layout_pages,
+            next_page=window.last_page + 1,
+            next_chunk_index=chunks_written,
+        )
+        # Bumped after the progress, as searches derive chunk counts from it
+        await bump_library_version(resource.user)
+
+    if chunks_written == 0:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="The PDF file is empty or could not be loaded.",
+        )
+
+    summaries = await summarize_resource(resource.id)
+    await resource.set(
+        {PDFResource.summary_embeddings: [to_bson_vector(v) for v in summaries]}
+    )
+    await bump_library_version(resource.user)
+
+    __logger.info(
+        f"Parsed resource {resource.id}: {text_layer_pages} pages from the text layer, "
+        f"{layout_pages} pages with {CONFIG.ingestion.layout_strategy}"
+    )
+    await update_progress(resource, status=IngestionStatus.READY, error=None)
+
+
+async def run_ingestion_job(resource_id: PydanticObjectId, file_path: str) -> None:
+    """Ingest a queued resource and record the outcome on it.
+
+    Transient failures, e.g. of the embedding server, are retried with
+    exponential backoff and resume from the last checkpoint. Parsing
+    errors are not retried.
+
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource to ingest.
+        file_path (str): Path to the stored PDF file.
+    """
+    max_retries = CONFIG.ingestion.max_retries
+
+    for attempt in range(max_retries + 1):
+        resource = await PDFResource.get(resource_id)
+
+        # The resource was deleted while it was waiting in the queue
+        if resource is None:
+            return
+
+        try:
+            await ingest_pdf(resource, file_path)
+            __logger.info(f"Ingested resource {resource_id}")
+            return
+
+        except HTTPException as e:
+            __logger.exception(f"Ingestion of resource {resource_id} failed")
+            error = e.detail
+            break
+
+        except Exception as e:
+            __logger.exception(f"Ingestion of resource {resource_id} failed")
+            error = str(e)
+
+            if attempt == max_retries:
+                break
+
+            delay = CONFIG.ingestion.retry_backoff_seconds * 2**attempt
+            __logger.info(f"Resuming ingestion of resource {resource_id} in {delay:.0f}s")
+            await update_progress(resource, error=error)
+            await asyncio.sleep(delay)
+
+    await update_progress(resource, status=IngestionStatus.FAILED, error=error)
+
+
+async def cleanup_abandoned_ingestions(live: Collection[PydanticObjectId] = ()) -> int:
+    """Delete resources whose ingestion stalled a long time ago without a live job.
+
+    Their chunks and stored files are deleted as well. Failed resources are
+    kept, so their ingestion can be retried.
+
+    Args:
+        live (Collection[PydanticObjectId]): IDs of resources queued or being ingested.
+
+    Returns:
+        int: The number of deleted resources.
+    """
+    cutoff = datetime.now() - timedelta(hours=CONFIG.ingestion.abandoned_after_hours)
+    resources = await PDFResource.find(
+        PDFResource.ingestion.status == IngestionStatus.PROCESSING,
+        PDFResource.ingestion.updated_at < cutoff,
+        NotIn(PDFResource.id, list(live)),
+    ).to_list()
+
+    for resource in resources:
+        await Chunk.find(Chunk.resource == resource.id, with_children=True).delete()
+        await VECTOR_STORE.delete_resource(resource.id)
+        await resource.delete()
+        await bump_library_version(resource.user)
+        delete_resource_file(resource.user, ResourceType.PDF, resource.id)
+
+    if resources:
+        __logger.info(f"Deleted {len(resources)} abandoned resources")
+
+    return len(resources)
+
+
+class IngestionQueue:
+    def __init__(self, workers: int, max_queue_size: int, cleanup_interval: float):
+        """
+        Bounded pool of background workers draining queued ingestion jobs.
+
+        :param workers: Number of jobs processed concurrently.
+        :param max_queue_size: Maximum number of jobs waiting for a worker.
+        :param cleanup_interval: Seconds between cleanups of abandoned ingestions.
+        """
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.cleanup_interval = cleanup_interval
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Resources queued or being ingested
+        self._live: set[PydanticObjectId] = set()
+
+    async def start(self) -> None:
+        """Start the worker tasks and the maintenance task on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._maintain(), name="ingestion-maintenance"))
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks. Unfinished jobs stay in the processing state."""
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, resource_id: PydanticObjectId, file_path: str) -> None:
+        """Enqueue a stored PDF file for ingestion.
+
+        Args:
+            resource_id (PydanticObjectId): The ID of the resource to ingest.
+            file_path (str): Path to the stored PDF file.
+
+        Raises:
+            HTTPException: If the queue is full.
+        """
+        # Already queued by the resumption of interrupted ingestions
+        if resource_id in self._live:
+            return
+
+        try:
+            self._queue.put_nowait((resource_id, file_path))
+            self._live.add(resource_id)
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many resources are being processed. Please try again later.",
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            resource_id, file_path = await self._queue.get()
+
+            try:
+                await run_ingestion_job(resource_id, file_path)
+            finally:
+                self._live.discard(resource_id)
+                self._queue.task_done()
+
+    async def _maintain(self) -> None:
+        await cleanup_abandoned_ingestions(self._live)
+
+        # Resume ingestions interrupted by a restart, waiting for free queue slots
+        async for resource in PDFResource.find(
+            PDFResource.ingestion.status == IngestionStatus.PROCESSING
+        ):
+            # Skip uploads queued since the start, marking the others before waiting
+            if resource.id in self._live:
+                continue
+            self._live.add(resource.id)
+
+            file_path = resource_file_path(resource.user, ResourceType.PDF, resource.id)
+            await self._queue.put((resource.id, file_path))
+
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            await cleanup_abandoned_ingestions(self._live)
+
+
+INGESTION_QUEUE = IngestionQueue(
+    workers=CONFIG.ingestion.workers,
+    max_queue_size=CONFIG.ingestion.max_queue_size,
+    cleanup_interval=CONFIG.ingestion.cleanup_interval_minutes * 60,
+)
+"""Global ingestion queue, started with the application."""
@@ -1,9 +1,13 @@
 from datetime import datetime
 from enum import Enum
-from typing import Annotated
+from typing import Annotated, Optional
 
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+from pymongo import ASCENDING, IndexModel
+
+from src.config import CONFIG
+from src.nlp.vectors import BsonVector
 
 
 class ResourceType(str, Enum):
@@ -11,11 +15,35 @@ class ResourceType(str, Enum):
     WEBPAGE = "webpage"
 
 
+class IngestionStatus(str, Enum):
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class IngestionProgress(BaseModel):
+    job_id: Optional[PydanticObjectId] = None
+    status: IngestionStatus = IngestionStatus.READY
+    pages_parsed: int = 0
+    pages_text_layer: int = 0
+    pages_layout: int = 0
+    chunks_embedded: int = 0
+    chunks_written: int = 0
+    next_page: int = 1
+    next_chunk_index: int = 0
+    error: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
 class Resource(Document):
     title: str
     type: ResourceType
     user: PydanticObjectId
     created_at: datetime = Field(default_factory=datetime.now)
+    ingestion: IngestionProgress = Field(default_factory=IngestionProgress)
+    sha256: Annotated[Optional[str], Indexed()] = None
+    ingestion_fingerprint: Optional[str] = None
+    summary_embeddings: list[BsonVector] = Field(default_factory=list)
 
     class Settings:
         name = "resources"
@@ -23,7 +51,7 @@ class Resource(Document):
 
 
 class PDFResource(Resource):
-    total_pages: int
+    total_pages: int = 0
 
 
 class WebpageResource(Resource):
@@ -34,7 +62,8 @@ class Chunk(Document):
     user: Annotated[PydanticObjectId, Indexed()]
     resource: Annotated[PydanticObjectId, Indexed()]
     content: str
-    embedding: list[float]
+    embedding: BsonVector
+    embedding_ann: Optional[BsonVector] = None
     index: int
 
     class Settings:
@@ -47,3 +76,32 @@ class PDFChunk(Chunk):
 
 
 class WebpageChunk(Chunk): ...
+
+
+class EmbeddingCacheEntry(Document):
+    model: str
+    key: str
+    embedding: BsonVector
+    last_used_at: datetime = Field(default_factory=datetime.now)
+
+    class Settings:
+        name = "embedding_cache"
+        indexes = [
+            IndexModel([("model", ASCENDING), ("key", ASCENDING)], unique=True),
+            # Entries that have not been used for the configured time are evicted
+            IndexModel(
+                [("last_used_at", ASCENDING)],
+                expireAfterSeconds=CONFIG.embedding_client.embed_cache_ttl_days * 86400,
+            ),
+        ]
+
+
+class StoredFile(BaseModel):
+    path: str
+    sha256: str
+    size: int
+
+
+class IngestionJob(BaseModel):
+    job_id: PydanticObjectId
+    resource: PDFResource
@@ -6,6 +6,8 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, status
 from src.auth.dependencies import current_user
 import src.resources.database as resources_db
 from src.resources.models import (
+    IngestionJob,
+    IngestionProgress,
     PDFChunk,
     PDFResource,
     Resource,
@@ -18,18 +20,22 @@ from src.users.models import UserDB
 router = APIRouter(prefix="/resources", tags=["resources"])
 
 
-@router.post("/pdf")
+@router.post(
+    "/pdf",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model_exclude={"resource": {"summary_embeddings"}},
+)
 async def create_pdf_resource(
     file: UploadFile, user: Annotated[UserDB, Depends(current_user)]
-):
-    """Create a new PDF resource.
+) -> IngestionJob:
+    """Create a new PDF resource and queue it for ingestion.
 
     Args:
         file (UploadFile): The PDF file to be processed.
         user (UserDB): The user creating the resource.
 
     Returns:
-        PDFResource: The created PDF resource.
+        IngestionJob: The ingestion job and the created PDF resource in the processing state.
     """
     if file.content_type != "application/pdf":
         raise HTTPException(
@@ -40,7 +46,7 @@ async def create_pdf_resource(
     return await resources_db.create_pdf_resource(file=file, user_id=user.id)
 
 
-@router.get("")
+@router.get("", response_model_exclude={"__all__": {"summary_embeddings"}})
 async def get_resources(
     user: Annotated[UserDB, Depends(current_user)],
     query: str = None,
@@ -57,7 +63,7 @@ async def get_resources(
     return await resources_db.get_resources(user.id, query)
 
 
-@router.get("/{resource_id}")
+@router.get("/{resource_id}", response_model_exclude={"summary_embeddings"})
 async def get_resource_by_id(
     resource_id: PydanticObjectId,
     user: Annotated[UserDB, Depends(current_user)],
@@ -76,7 +82,44 @@ async def get_resource_by_id(
     return await resources_db.get_resource_by_id(resource_id, user.id)
 
 
-@router.get("/chunk/{chunk_id}", response_model_exclude={"embedding"})
+@router.get("/{resource_id}/status")
+async def get_resource_status(
+    resource_id: PydanticObjectId,
+    user: Annotated[UserDB, Depends(current_user)],
+) -> IngestionProgress:
+    """Get the ingestion progress of a specific resource.
+
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource.
+        user (UserDB): The user requesting the status.
+
+    Returns:
+        IngestionProgress: Pages parsed, chunks embedded and chunks written so far.
+    """
+    return await resources_db.get_resource_status(resource_id, user.id)
+
+
+@router.post("/{resource_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_resource_ingestion(
+    resource_id: PydanticObjectId,
+    user: Annotated[UserDB, Depends(current_user)],
+) -> IngestionJob:
+    """Retry a failed ingestion, resuming from its last checkpoint.
+
+    Args:
+        resource_id (PydanticObjectId): The ID of the resource to ingest.
+        user (UserDB): The user requesting the retry.
+
+    Returns:
+        IngestionJob: The ingestion job and the resource in the processing state.
+
+    Raises:
+        HTTPException: If the ingestion of the resource has not failed.
+    """
+    return await resources_db.retry_resource_ingestion(resource_id, user.id)
+
+
+@router.get("/chunk/{chunk_id}", response_model_exclude={"embedding", "embedding_ann"})
 async def get_chunk_by_id(
     chunk_id: PydanticObjectId,
     user: Annotated[UserDB, Depends(current_user)],
@@ -1,28 +1,28 @@
+import hashlib
 import os
 
 from beanie import PydanticObjectId
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 
 from src.config import CONFIG
-from src.resources.models import ResourceType
+from src.resources.models import ResourceType, StoredFile
 
 
-async def store_resource_file(
-    file: UploadFile,
+def resource_file_path(
     user_id: PydanticObjectId,
     resource_type: ResourceType,
     resource_id: PydanticObjectId,
 ) -> str:
-    """Store a resource file in the storage system.
+    """Build the storage path of a resource file.
 
     Args:
-        file (UploadFile): The file to be stored.
         user_id (PydanticObjectId): The ID of the user who owns the resource.
         resource_type (ResourceType): The type of the resource.
         resource_id (PydanticObjectId): The ID of the resource.
 
     Returns:
-        str: The storage path of the stored file.
+        str: The storage path of the resource file.
     """
     storage_path = os.path.join(
         CONFIG.storage.directory,
@@ -31,15 +31,144 @@ async def store_resource_file(
         str(resource_id),
     )
 
-    os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-
     if resource_type == ResourceType.PDF:
         storage_path += ".pdf"
 
     elif resource_type == ResourceType.WEBPAGE:
         storage_path += ".html"
 
-    with open(storage_path, "wb") as f:
-        f.write(await file.read())
-
     return storage_path
+
+
+def delete_resource_file(
+    user_id: PydanticObjectId,
+    resource_type: ResourceType,
+    resource_id: PydanticObjectId,
+) -> None:
+    """Delete a resource file from the storage system, if it exists.
+
+    Args:
+        user_id (PydanticObjectId): The ID of the user who owns the resource.
+        resource_type (ResourceType): The type of the resource.
+        resource_id (PydanticObjectId): The ID of the resource.
+    """
+    storage_path = resource_file_path(user_id, resource_type, resource_id)
+
+    if os.path.exists(storage_path):
+        os.remove(storage_path)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the maximum upload size of {CONFIG.storage.max_upload_bytes} bytes.",
+    )
+
+
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def store_resource_file(
+    file: UploadFile,
+    user_id: PydanticObjectId,
+    resource_type: ResourceType,
+    resource_id: PydanticObjectId,
+) -> StoredFile:
+    """Stream a resource file into the storage system and hash its content.
+
+    The file is written chunk-wise to a temporary file off the event loop
+    and atomically renamed once complete, so partial uploads never appear
+    under the final path.
+
+    Oversized request bodies are already rejected before parsing by
+    `UploadSizeLimitMiddleware`, the exact file size is checked here.
+
+    Args:
+        file (UploadFile): The file to be stored.
+        user_id (PydanticObjectId): The ID of the user who owns the resource.
+        resource_type (ResourceType): The type of the resource.
+        resource_id (PydanticObjectId): The ID of the resource.
+
+    Returns:
+        StoredFile: The storage path, SHA-256 digest and size of the stored file.
+
+    Raises:
+        HTTPException: If the file exceeds the maximum upload size.
+    """
+    if file.size is not None and file.size > CONFIG.storage.max_upload_bytes:
+        raise _too_large()
+
+    storage_path = resource_file_path(user_id, resource_type, resource_id)
+    temp_path = storage_path + ".part"
+
+    os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+
+    f = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        while chunk := await file.read(CONFIG.storage.upload_chunk_bytes):
+            size += len(chunk)
+            if size > CONFIG.storage.max_upload_bytes:
+                raise _too_large()
+
+            await run_in_threadpool(_write_chunk, f, digest, chunk)
+
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.replace, temp_path, storage_path)
+
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(os.remove, temp_path)
+        raise
+
+    return StoredFile(path=storage_path, sha256=digest.hexdigest(), size=size)
+
+
+def _copy_file(source_path: str, temp_path: str) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(source_path, "rb") as source, open(temp_path, "wb") as f:
+        while chunk := source.read(CONFIG.storage.upload_chunk_bytes):
+            size += len(chunk)
+            _write_chunk(f, digest, chunk)
+
+    return digest.hexdigest(), size
+
+
+async def store_local_file(
+    source_path: str,
+    user_id: PydanticObjectId,
+    resource_type: ResourceType,
+    resource_id: PydanticObjectId,
+) -> StoredFile:
+    """Copy a local file into the storage system and hash its content.
+
+    Args:
+        source_path (str): Path of the file to copy.
+        user_id (PydanticObjectId): The ID of the user who owns the resource.
+        resource_type (ResourceType): The type of the resource.
+        resource_id (PydanticObjectId): The ID of the resource.
+
+    Returns:
+        StoredFile: The storage path, SHA-256 digest and size of the stored file.
+    """
+    storage_path = resource_file_path(user_id, resource_type, resource_id)
+    temp_path = storage_path + ".part"
+
+    os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+
+    try:
+        sha256, size = await run_in_threadpool(_copy_file, source_path, temp_path)
+        await run_in_threadpool(os.replace, temp_path, storage_path)
+
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return StoredFile(path=storage_path, sha256=sha256, size=size)
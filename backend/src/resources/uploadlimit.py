@@ -0,0 +1,66 @@
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Room for the multipart boundaries and part headers around the file
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, path: str, max_bytes: int):
+        """
+        Reject oversized upload requests before their body is parsed.
+
+        Form parsing spools the whole multipart body to a temporary file
+        before the endpoint runs, so the limit has to be enforced on the raw
+        request. Requests announcing a larger `Content-Length` are answered
+        right away, bodies streamed without one are cut off once they exceed
+        the limit.
+
+        :param app: The wrapped application.
+        :param path: Path of the upload endpoint.
+        :param max_bytes: Maximum size of the uploaded file.
+        """
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_bytes + _MULTIPART_OVERHEAD
+
+    def _too_large(self) -> str:
+        return f"File exceeds the maximum upload size of {self.max_bytes} bytes."
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith(self.path):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > self.max_body_bytes:
+                response = JSONResponse(
+                    {"detail": self._too_large()},
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Passed through by the body parsing of FastAPI
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=self._too_large(),
+                    )
+
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
+
+from src.config import CONFIG
+
+
+class SearchBatchBody(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=CONFIG.search.batch_max_queries)
+    resource_ids: Optional[list[PydanticObjectId]] = None
+
+
+class SearchHit(BaseModel):
+    chunk_id: PydanticObjectId
+    resource_id: PydanticObjectId
+    page_number: Optional[int] = None
+    score: float
+
+
+class SearchResult(BaseModel):
+    query: str
+    hits: list[SearchHit]
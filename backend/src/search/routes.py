@@ -0,0 +1,56 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from src.auth.dependencies import current_user
+from src.config import CONFIG
+from src.nlp.embeddings import embed_queries, similarity_search
+from src.search.models import SearchBatchBody, SearchHit, SearchResult
+from src.users.models import UserDB
+
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.post("/batch")
+async def search_batch(
+    body: SearchBatchBody, user: Annotated[UserDB, Depends(current_user)]
+) -> list[SearchResult]:
+    """Retrieve the chunks for many queries at once, without generating answers.
+
+    All queries are embedded in batches first, then searched concurrently,
+    at most `search.batch_concurrency` at a time.
+
+    Args:
+        body (SearchBatchBody): The request body containing the queries and resource IDs.
+        user (UserDB): The authenticated user making the request.
+
+    Returns:
+        list[SearchResult]: The selected chunks of every query, in the order of the queries.
+    """
+    embeddings = await embed_queries(body.queries)
+    semaphore = asyncio.Semaphore(CONFIG.search.batch_concurrency)
+
+    async def search(query: str, embedding) -> SearchResult:
+        async with semaphore:
+            chunks = await similarity_search(
+                query, user.id, body.resource_ids, query_embedding=embedding
+            )
+
+        return SearchResult(
+            query=query,
+            hits=[
+                SearchHit(
+                    chunk_id=chunk.id,
+                    resource_id=chunk.resource,
+                    page_number=chunk.page_number,
+                    score=chunk.score,
+                )
+                for chunk in chunks
+            ],
+        )
+
+    return await asyncio.gather(
+        *(search(query, embedding) for query, embedding in zip(body.queries, embeddings))
+    )
@@ -1,5 +1,33 @@
+from beanie import PydanticObjectId
+
 from src.users.models import UpdateUserBody, UserDB
 
 
 async def update(body: UpdateUserBody, user: UserDB) -> UserDB:
     return await user.set(body.model_dump(exclude_unset=True))
+
+
+async def get_library_version(user_id: PydanticObjectId) -> int:
+    """Get the version of a user's library, changed whenever their chunks change.
+
+    Args:
+        user_id (PydanticObjectId): The ID of the user.
+
+    Returns:
+        int: The library version.
+    """
+    user = await UserDB.get_pymongo_collection().find_one(
+        {"_id": user_id}, {"library_version": 1}
+    )
+    return user.get("library_version", 0) if user else 0
+
+
+async def bump_library_version(user_id: PydanticObjectId) -> None:
+    """Invalidate cached search results of a user after their library changed.
+
+    Args:
+        user_id (PydanticObjectId): The ID of the user.
+    """
+    await UserDB.get_pymongo_collection().update_one(
+        {"_id": user_id}, {"$inc": {"library_version": 1}}
+    )
@@ -16,6 +16,7 @@ class UserDB(Document, User):
 
     email: Annotated[str, Indexed(EmailStr, unique=True)]
     hashed_password: str
+    library_version: int = 0
 
     class Settings:
         name = "users"
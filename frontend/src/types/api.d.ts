@@ -21,12 +21,27 @@ export type TokensWithUser = Tokens & {
   user: User;
 };
 
+export interface IngestionProgress {
+  job_id: string | null;
+  status: "processing" | "ready" | "failed";
+  pages_parsed: number;
+  pages_text_layer: number;
+  pages_layout: number;
+  chunks_embedded: number;
+  chunks_written: number;
+  next_page: number;
+  next_chunk_index: number;
+  error: string | null;
+  updated_at: string;
+}
+
 interface BaseResource {
   _id: string;
   type: "pdf" | "webpage";
   title: string;
   user: string;
   created_at: string;
+  ingestion: IngestionProgress;
 }
 
 export interface PdfResource extends BaseResource {
@@ -39,6 +54,11 @@ export interface WebpageResource extends BaseResource {
 
 export type Resource = PdfResource | WebpageResource;
 
+export interface IngestionJob {
+  job_id: string;
+  resource: PdfResource;
+}
+
 export interface ResourceChatBody {
   query: string;
   resource_ids?: string[];